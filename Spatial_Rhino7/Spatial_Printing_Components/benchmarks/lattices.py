@@ -0,0 +1,152 @@
+"""
+Parametric lattice generators for the benchmarks, built from plain spatial_sorting geometry.
+"""
+
+import random
+
+from spatial_sorting import Line, Point
+
+#struts per unit cell of each lattice, used to pick a cell count for a strut count
+STRUTS_PER_CELL = {"cubic": 3, "octet": 24, "n_bracing": 5}
+
+
+def _finish(points, struts, seed, flip_fraction):
+    #flip and shuffle the struts the way lines come out of a Rhino model
+    rnd = random.Random(seed)
+    lines = []
+    for start, end in struts:
+        if rnd.random() < flip_fraction:
+            start, end = end, start
+        lines.append(Line(points[start], points[end]))
+    rnd.shuffle(lines)
+    return lines, list(points.values())
+
+def cubic(cells, cell_size=10.0, seed=0, flip_fraction=0.3):
+    """
+    Cubic lattice: struts along the X, Y and Z edges of every cell.
+
+    Parameters:
+    cells (tuple): Number of cells along X, Y and Z.
+    cell_size (float): Edge length of a cell.
+    seed (int): Seed of the flips and the shuffle.
+    flip_fraction (float): Share of struts that run top to bottom.
+
+    Returns:
+    tuple: The lines and the node points.
+    """
+    nx, ny, nz = cells
+    points = {}
+    for i in range(nx + 1):
+        for j in range(ny + 1):
+            for k in range(nz + 1):
+                points[(i, j, k)] = Point(i * cell_size, j * cell_size, k * cell_size)
+
+    struts = []
+    for (i, j, k) in points:
+        for neighbor in ((i + 1, j, k), (i, j + 1, k), (i, j, k + 1)):
+            if neighbor in points:
+                struts.append(((i, j, k), neighbor))
+    return _finish(points, struts, seed, flip_fraction)
+
+def octet(cells, cell_size=10.0, seed=0, flip_fraction=0.3):
+    """
+    Octet truss: the face centered cubic points, each joined to its twelve nearest neighbors.
+
+    Parameters:
+    cells (tuple): Number of cells along X, Y and Z.
+    cell_size (float): Edge length of a cell.
+    seed (int): Seed of the flips and the shuffle.
+    flip_fraction (float): Share of struts that run top to bottom.
+
+    Returns:
+    tuple: The lines and the node points.
+    """
+    nx, ny, nz = cells
+    half = cell_size / 2
+    points = {}
+    for i in range(2 * nx + 1):
+        for j in range(2 * ny + 1):
+            for k in range(2 * nz + 1):
+                if (i + j + k) % 2 == 0:
+                    points[(i, j, k)] = Point(i * half, j * half, k * half)
+
+    offsets = ((1, 1, 0), (1, -1, 0), (1, 0, 1), (1, 0, -1), (0, 1, 1), (0, 1, -1))
+    struts = []
+    for (i, j, k) in points:
+        for di, dj, dk in offsets:
+            neighbor = (i + di, j + dj, k + dk)
+            if neighbor in points:
+                struts.append(((i, j, k), neighbor))
+    return _finish(points, struts, seed, flip_fraction)
+
+def n_bracing(cells, cell_size=10.0, seed=0, flip_fraction=0.3):
+    """
+    Braced frame: columns, beams, and one diagonal per side panel, all leaning the same way.
+
+    Parameters:
+    cells (tuple): Number of cells along X, Y and Z.
+    cell_size (float): Edge length of a cell.
+    seed (int): Seed of the flips and the shuffle.
+    flip_fraction (float): Share of struts that run top to bottom.
+
+    Returns:
+    tuple: The lines and the node points.
+    """
+    nx, ny, nz = cells
+    points = {}
+    for i in range(nx + 1):
+        for j in range(ny + 1):
+            for k in range(nz + 1):
+                points[(i, j, k)] = Point(i * cell_size, j * cell_size, k * cell_size)
+
+    struts = []
+    for (i, j, k) in points:
+        for neighbor in ((i + 1, j, k), (i, j + 1, k), (i, j, k + 1), (i + 1, j, k + 1), (i, j + 1, k + 1)):
+            if neighbor in points:
+                struts.append(((i, j, k), neighbor))
+    return _finish(points, struts, seed, flip_fraction)
+
+GENERATORS = {"cubic": cubic, "octet": octet, "n_bracing": n_bracing}
+
+def lattice_for_struts(kind, struts, seed=0):
+    """
+    Generate a cube shaped lattice with about the given number of struts.
+
+    Parameters:
+    kind (str): One of GENERATORS.
+    struts (int): Target strut count.
+    seed (int): Seed of the flips and the shuffle.
+
+    Returns:
+    tuple: The lines and the node points.
+    """
+    side = max(1, int(round((struts / STRUTS_PER_CELL[kind]) ** (1.0 / 3))))
+    return GENERATORS[kind]((side, side, side), seed=seed)
+
+def jittered(lines, points, seed=0, step=.001, steps=10):
+    """
+    Move every node of a lattice off the grid by a random multiple of step along each axis.
+
+    The generated lattices sit on multiples of 5, so their coordinates never
+    land on a rounding tie. Moved by whole millimeters they do, the way
+    modelled coordinates with 3 decimals often do. Lines sharing a node
+    still share it after the move.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects, the nodes of the lines.
+    seed (int): Seed of the moves.
+    step (float): Size of one move.
+    steps (int): Largest number of steps a coordinate is moved, either way.
+
+    Returns:
+    tuple: The moved lines and node points.
+    """
+    rnd = random.Random(seed)
+    moved = {}
+    for pt in points:
+        moved[(pt.X, pt.Y, pt.Z)] = Point(round(pt.X + rnd.randint(-steps, steps) * step, 3),
+                                          round(pt.Y + rnd.randint(-steps, steps) * step, 3),
+                                          round(pt.Z + rnd.randint(-steps, steps) * step, 3))
+    moved_lines = [Line(moved[(line.From.X, line.From.Y, line.From.Z)], moved[(line.To.X, line.To.Y, line.To.Z)]) for line in lines]
+    return moved_lines, list(moved.values())
@@ -0,0 +1,322 @@
+"""
+The original O(n^2) weighting, combining and depth first search of the
+Grasshopper script, kept as the reference the benchmarks check against.
+
+The functions are the ones the script started from, with the Rhino calls
+replaced by the spatial_sorting geometry and the drawing and printing
+left out. They flip the lines they are given in place, pass copies.
+Two deliberate fixes of the package are applied here too, so only
+unintended changes show up: removed overlaps are marked instead of
+removed while iterating, which skipped the line after every removal, and
+the depth first search no longer stops a vertex early when it is
+re-entered.
+"""
+
+import sys
+
+from spatial_sorting import Line
+
+
+def add_weight_to_lines(lines):
+    weights = {}
+    for line in lines:
+        start_point = line.From
+        end_point = line.To
+
+        weight = 0
+        average_z = (start_point.Z + end_point.Z) / 2
+
+        if start_point.Z == end_point.Z:
+            pass
+
+        elif round(start_point.X, 2) == round(end_point.X, 2) and round(start_point.Y, 2) == round(end_point.Y, 2):
+            if start_point.Z > end_point.Z:
+                line.Flip()
+
+            weight_vertical_at_start = find_intersection_vertical_at_end(line, lines)
+            weight_vertical_at_end = find_intersection_vertical_at_start(line, lines)
+            weight_vertical_no_top = vertical_no_angle_at_top(line, lines)
+
+            weight = weight + weight_vertical_at_start + weight_vertical_at_end + weight_vertical_no_top
+
+        else:
+            if start_point.Z > end_point.Z:
+                line.Flip()
+            weight_angled_atstart = find_intersection_angled_at_start(line, lines)
+            weight_angled_atend = find_intersection_angled_at_end(line, lines)
+            weight_with_angled_at_start = verticals_with_angled_at_start(line, lines)
+
+            weight = weight + weight_angled_atstart + weight_angled_atend + weight_with_angled_at_start
+
+        weight = weight + average_z - 32.481
+        weight = round(weight, 3)
+        weights[line] = weight
+    return weights
+
+def find_intersection_vertical_at_start(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    weight_vertical = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+
+    for line in graph_lines:
+        if abs(line.To.Z - line.From.Z) <= .02:
+            weight_vertical = 0
+
+        elif line.From.X == line.To.X and line.From.Y == line.To.Y:
+            weight_vertical = 0
+
+        else:
+            if line.From.Z > line.To.Z:
+                line.Flip()
+            if round(line.From.X, 2) == round(start_point.X, 2) and round(line.From.Y, 2) == round(start_point.Y, 2) and round(line.From.Z, 2) == round(start_point.Z, 2):
+                weight_vertical = 0.1
+                return weight_vertical
+
+    return weight_vertical
+
+def find_intersection_vertical_at_end(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    weight_vertical = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+
+    for line in graph_lines:
+        if abs(end_point.Z - start_point.Z) <= .02:
+            weight_vertical = 0
+
+        elif line.From.X == line.To.X and line.From.Y == line.To.Y:
+            weight_vertical = 0
+        else:
+            if line.From.Z > line.To.Z:
+                line.Flip()
+            if round(line.To.X, 2) == round(end_point.X, 2) and round(line.To.Y, 2) == round(end_point.Y, 2) and round(line.To.Z, 2) == round(end_point.Z, 2):
+                weight_vertical = 0.05
+                return weight_vertical
+
+    return weight_vertical
+
+def find_intersection_angled_at_start(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    weight_angled = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+
+    for line in graph_lines:
+        if abs(end_point.Z - start_point.Z) <= .02:
+            weight_angled = 0
+        elif round(line.From.X, 2) == round(line.To.X, 2) and round(line.From.Y, 2) == round(line.To.Y, 2):
+            if line.From.Z > line.To.Z:
+                line.Flip()
+            if round(line.From.X, 2) == round(start_point.X, 2) and round(line.From.Y, 2) == round(start_point.Y, 2) and round(line.From.Z, 2) == round(start_point.Z, 2):
+                weight_angled = -0.15
+                return weight_angled
+
+        else:
+            weight_angled = 0
+    return weight_angled
+
+def find_intersection_angled_at_end(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    weight_angled = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+
+    for line in graph_lines:
+        if abs(line.To.Z - line.From.Z) <= .02:
+            weight_angled = 0
+
+        elif line.From.X == line.To.X and line.From.Y == line.To.Y:
+            if line.From.Z > line.To.Z:
+                line.Flip()
+
+            if round(line.To.X, 2) == round(end_point.X, 2) and round(line.To.Y, 2) == round(end_point.Y, 2) and round(line.To.Z, 2) == round(end_point.Z, 2):
+                weight_angled = 0.21
+                return weight_angled
+
+        else:
+            weight_angled = 0
+
+    return weight_angled
+
+def verticals_with_angled_at_start(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    weight_angled = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+    for line in graph_lines:
+        if line.From.Z > line.To.Z:
+            line.Flip()
+        if round(line.From.X, 2) == round(start_point.X, 2) and round(line.From.Y, 2) == round(start_point.Y, 2) and round(line.From.Z, 2) == round(start_point.Z, 2) and round(line.To.X, 2) == round(end_point.X, 2) and round(line.To.Y, 2) == round(end_point.Y, 2) and round(line.To.Z, 2) == round(end_point.Z, 2):
+            pass
+        elif round(end_point.X, 2) == round(line.To.X, 2) and round(end_point.Y, 2) == round(line.To.Y, 2) and round(end_point.Z, 2) == round(line.To.Z, 2):
+                if round(line.From.X, 2) == round(line.To.X, 2) and round(line.From.Y, 2) == round(line.To.Y, 2):
+                    weight_angled = find_intersection_vertical_at_start(line, graph_lines)
+                    return weight_angled
+
+    return weight_angled
+
+def vertical_no_angle_at_top(input_line, graph_lines):
+    start_point = input_line.From
+    end_point = input_line.To
+
+    average_z_input_line = (start_point.Z + end_point.Z) / 2
+    weight_vertical = 0
+
+    if start_point.Z > end_point.Z:
+        input_line.Flip()
+    count = 0
+    for line in graph_lines:
+        if abs(line.To.Z - line.From.Z) <= .02:
+            weight_vertical = 0
+
+        elif line.From.X == line.To.X and line.From.Y == line.To.Y:
+            weight_vertical = 0
+
+        else:
+            if line.From.Z > line.To.Z:
+                line.Flip()
+            average_z_line = (line.From.Z + line.To.Z) / 2
+            if average_z_line <= average_z_input_line:
+                if round(line.To.X, 2) == round(end_point.X, 2) and round(line.To.Y, 2) == round(end_point.Y, 2) and round(line.To.Z, 2) == round(end_point.Z, 2):
+                    count += 1
+
+    if count == 0:
+        weight_vertical = .07
+
+    return weight_vertical
+
+
+def _keys_equal(pt_a, pt_b):
+    return round(pt_a.X, 2) == round(pt_b.X, 2) and round(pt_a.Y, 2) == round(pt_b.Y, 2) and round(pt_a.Z, 2) == round(pt_b.Z, 2)
+
+def _vectors_equal(line_a, line_b):
+    line_a_vector = (line_a.To - line_a.From).Unitized()
+    line_b_vector = (line_b.To - line_b.From).Unitized()
+    return round(line_a_vector.X, 2) == round(line_b_vector.X, 2) and round(line_a_vector.Y, 2) == round(line_b_vector.Y, 2) and round(line_a_vector.Z, 2) == round(line_b_vector.Z, 2)
+
+def _horizontal_pt_int_test(pt, crvs):
+    for crv in crvs:
+        if _keys_equal(pt, crv.From):
+            if crv.From.Z == crv.To.Z:
+                return False
+        elif _keys_equal(pt, crv.To):
+            if crv.From.Z == crv.To.Z:
+                return False
+    return True
+
+def combine_lines(crvs, weights):
+    new_lines = []
+    new_weights = []
+
+    for i in range(len(crvs)):
+        line_a = crvs[i]
+        line_a_start_pt = line_a.From
+        line_a_end_pt = line_a.To
+        if line_a_start_pt.Z > line_a_end_pt.Z:
+            line_a.Flip()
+
+        for j in range(len(crvs)):
+            line_b = crvs[j]
+            weight = weights[i]
+            alt_weight = weights[j]
+            added_line = False
+
+            line_b_start_pt = line_b.From
+            line_b_end_pt = line_b.To
+            if line_b_start_pt.Z > line_b_end_pt.Z:
+                line_b.Flip()
+            if _vectors_equal(line_a, line_b) and _keys_equal(line_a.To, line_b.From):
+                dist = abs(line_a_start_pt.DistanceTo(line_b_end_pt))
+                if _horizontal_pt_int_test(line_a_end_pt, crvs) and _horizontal_pt_int_test(line_b_start_pt, crvs) and dist < 40:
+                    if round(line_b_start_pt.X, 2) == round(line_b_end_pt.X, 2) and round(line_b_start_pt.Y, 2) == round(line_b_end_pt.Y, 2):
+                        new_lines.append(Line(line_a_start_pt, line_b_end_pt))
+                        new_weights.append(alt_weight + .13)
+                        added_line = True
+                        break
+                    else:
+                        new_lines.append(Line(line_a_start_pt, line_b_end_pt))
+                        new_weights.append(alt_weight)
+                        added_line = True
+                        break
+        if added_line is False:
+            new_lines.append(line_a)
+            new_weights.append(weight)
+
+    return new_lines, new_weights
+
+def remove_overlapping_lines(new_lines, new_weights):
+    deleted = [False] * len(new_lines)
+    for line_a in new_lines:
+        line_a_start_pt = line_a.From
+        line_a_end_pt = line_a.To
+        line_a_midpoint = line_a.PointAtLength(line_a.Length/2)
+        if line_a.Length <= 20:
+            continue
+
+        for j, line_b in enumerate(new_lines):
+            line_b_start_pt = line_b.From
+            line_b_end_pt = line_b.To
+            line_b_midpoint = line_b.PointAtLength(line_b.Length/2)
+            if deleted[j] or line_b_start_pt.Z == line_b_end_pt.Z:
+                continue
+            if round(line_b_start_pt.X, 2) == round(line_b_end_pt.X, 2) and round(line_b_start_pt.Y, 2) == round(line_b_end_pt.Y, 2):
+                continue
+            if not _vectors_equal(line_a, line_b) or line_b.Length >= 20:
+                continue
+
+            #every midpoint branch of the original ends in the same two endpoint tests
+            touching = (_keys_equal(line_a_midpoint, line_b_start_pt) or _keys_equal(line_a_midpoint, line_b_end_pt)
+                        or _keys_equal(line_b_midpoint, line_a_start_pt) or _keys_equal(line_b_midpoint, line_a_end_pt))
+            on_end = _keys_equal(line_a_end_pt, line_b_end_pt)
+            mixed = round(line_a_start_pt.X, 2) == round(line_b_start_pt.X, 2) and round(line_a_end_pt.Y, 2) == round(line_b_end_pt.Y, 2) and round(line_a_end_pt.Z, 2) == round(line_b_end_pt.Z, 2)
+            if touching and (on_end or mixed):
+                deleted[j] = True
+
+    new_lines[:] = [line for j, line in enumerate(new_lines) if not deleted[j]]
+    new_weights[:] = [weight for j, weight in enumerate(new_weights) if not deleted[j]]
+    return new_lines, new_weights
+
+def dfs_edges(lines, points):
+    #(start index, end index) of every edge in the order the original search visits them
+    graph = {i: [] for i in range(len(points))}
+    for line in lines:
+        start, end = line.From, line.To
+        if start in points and end in points:
+            graph[points.index(start)].append(points.index(end))
+            graph[points.index(end)].append(points.index(start))
+
+    visited_edges = set()
+    edges = []
+
+    def dfs(vertex):
+        for neighbor_index in graph[vertex]:
+            edge_key = frozenset({vertex, neighbor_index})
+            if edge_key not in visited_edges:
+                visited_edges.add(edge_key)
+                edges.append((vertex, neighbor_index))
+                dfs(neighbor_index)
+
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(recursion_limit, 2 * len(lines) + 100))
+    try:
+        for start_index in range(len(points)):
+            dfs(start_index)
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    return edges
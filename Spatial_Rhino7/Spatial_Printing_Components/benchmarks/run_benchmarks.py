@@ -0,0 +1,248 @@
+"""
+Benchmarks of the spatial_sorting stages on generated lattices, off Rhino.
+
+Run from any folder:
+
+    python run_benchmarks.py --kinds cubic octet --sizes 1000 10000 --output results.json
+    python run_benchmarks.py --sizes 1000 10000 --compare results.json
+
+Every stage is timed on its own, then run again under tracemalloc for its
+peak memory. Lattices up to --check-limit struts are also run through
+reference.py, the original O(n^2) code, and any difference in weights,
+combined lines or print order is reported and fails the run. The whole
+weighting step is also timed serially and on a pool of --workers
+processes, and the speedup is reported, and iter_band_order reports what
+each of its bands costs beyond the band. The stages built on top of the
+original ones are tested in tests/test_spatial_sorting.py.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial_sorting import (POINT_TOLERANCE, EndpointIndex, Instrumentation, Line, add_weight_to_lines,
+                             add_weight_to_lines_parallel, build_graph, combine_lines, iter_band_order, iter_dfs_edge_ids,
+                             iter_weighted_edge_ids, line_endpoint_array, remove_overlapping_lines, weight_array)
+from spatial_sorting.weighting import line_weight
+
+import lattices
+import reference
+
+SIZES = (1000, 10000, 100000, 1000000)
+
+
+def run_stages(lines, points, measure):
+    """
+    Run the pipeline once, handing every stage to measure.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects.
+    measure (function): Called as measure(stage name, function), returns the result of the function.
+
+    Returns:
+    tuple: The per-line weights, the combined lines and weights, and the DFS order.
+    """
+    index = measure("index", lambda: EndpointIndex(lines, tolerance=POINT_TOLERANCE))
+    weights = measure("weighting", lambda: [line_weight(line_id, index) for line_id in range(len(lines))])
+    try:
+        endpoints = measure("endpoint_array", lambda: line_endpoint_array(lines))
+    except ImportError:
+        #the NumPy engine imports numpy when it is first called
+        pass
+    else:
+        measure("weighting_numpy", lambda: weight_array(endpoints))
+
+    graph, missing_lines = measure("graph", lambda: build_graph(lines, points, POINT_TOLERANCE))
+    for edge_id, weight in enumerate(weights):
+        graph.weight[edge_id] = weight
+    order = measure("traversal", lambda: [(start, end) for order, start, end, edge_id in iter_dfs_edge_ids(graph)])
+    heights = [pt.Z for pt in points]
+    measure("weighted_traversal", lambda: list(iter_weighted_edge_ids(graph, heights)))
+
+    combined = measure("combine", lambda: combine_lines(lines, weights, index.records))
+    measure("dedupe", lambda: remove_overlapping_lines(*combined))
+    return weights, combined, order
+
+def time_stages(lines, points):
+    stages = {}
+
+    def measure(name, function):
+        start = time.perf_counter()
+        result = function()
+        stages[name] = {"seconds": time.perf_counter() - start}
+        return result
+
+    run_stages(lines, points, measure)
+    return stages
+
+def memory_stages(lines, points):
+    peaks = {}
+
+    def measure(name, function):
+        tracemalloc.start()
+        try:
+            result = function()
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    run_stages(lines, points, measure)
+    return peaks
+
+def time_parallel(lines, workers):
+    """
+    Time add_weight_to_lines against add_weight_to_lines_parallel on the same lines.
+
+    Parameters:
+    lines (list): List of Line objects.
+    workers (int): Number of processes of the parallel run.
+
+    Returns:
+    dict: The workers, both times, the speedup and whether the weights are the same.
+    """
+    start = time.perf_counter()
+    weights = add_weight_to_lines(lines)
+    serial_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel_weights = add_weight_to_lines_parallel(lines, workers=workers)
+    parallel_seconds = time.perf_counter() - start
+    return {"workers": workers, "serial_seconds": serial_seconds, "parallel_seconds": parallel_seconds,
+            "speedup": serial_seconds / parallel_seconds if parallel_seconds else float("inf"),
+            "same": list(weights.items()) == list(parallel_weights.items())}
+
+def band_overhead(lines, band_height=10.0):
+    """
+    Stream the lines through iter_band_order and measure what each band costs beyond its own lines.
+
+    Parameters:
+    lines (list): List of Line objects.
+    band_height (float): Height of the Z bands.
+
+    Returns:
+    dict: The band count, the seconds per band, the seconds per band spent finding the halo,
+    the halo lines indexed per band line and the share of their records reused from the band below.
+    """
+    instrumentation = Instrumentation()
+    start = time.perf_counter()
+    for band in iter_band_order(lines, band_height, instrumentation=instrumentation):
+        pass
+    seconds = time.perf_counter() - start
+    counters = instrumentation.counters
+    bands = counters["bands"]
+    indexed = counters["band_lines"] + counters["halo_lines"]
+    return {"bands": bands, "seconds_per_band": seconds / bands,
+            "halo_seconds_per_band": instrumentation.seconds["band_halo"] / bands,
+            "halo_lines_per_band_line": counters["halo_lines"] / counters["band_lines"],
+            "records_reused": counters["records_reused"] / indexed}
+
+def _line_key(line):
+    return (line.From.X, line.From.Y, line.From.Z, line.To.X, line.To.Y, line.To.Z)
+
+def _copy_lines(lines):
+    return [Line(line.From, line.To) for line in lines]
+
+def check_reference(lines, points):
+    """
+    Compare the package with the original code on one lattice.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects.
+
+    Returns:
+    dict: True or False for the weights, the combined lines and the print order.
+    """
+    reference_weights = reference.add_weight_to_lines(_copy_lines(lines))
+    weights = add_weight_to_lines(lines)
+    same_weights = [(_line_key(line), weight) for line, weight in reference_weights.items()] == \
+                   [(_line_key(line), weight) for line, weight in weights.items()]
+
+    #the combining stage reads the weighted lines, bottom to top
+    weighted_lines = list(reference_weights.keys())
+    weight_values = list(reference_weights.values())
+    reference_lines, reference_combined = reference.remove_overlapping_lines(*reference.combine_lines(_copy_lines(weighted_lines), list(weight_values)))
+    combined_lines, combined_weights = remove_overlapping_lines(*combine_lines(_copy_lines(weighted_lines), list(weight_values)))
+    same_combined = [_line_key(line) for line in reference_lines] == [_line_key(line) for line in combined_lines] and \
+                    reference_combined == combined_weights
+
+    graph, missing_lines = build_graph(lines, points, POINT_TOLERANCE)
+    order = [(start, end) for order, start, end, edge_id in iter_dfs_edge_ids(graph)]
+    same_order = reference.dfs_edges(_copy_lines(lines), points) == order
+
+    return {"weights": same_weights, "combined": same_combined, "order": same_order}
+
+def compare(results, previous_path):
+    #print the time of every stage against an earlier results file
+    with open(previous_path) as previous_file:
+        previous = {(entry["kind"], entry["struts"]): entry for entry in json.load(previous_file)["results"]}
+    for entry in results:
+        before = previous.get((entry["kind"], entry["struts"]))
+        if before is None:
+            continue
+        for name, stage in entry["stages"].items():
+            if name not in before["stages"]:
+                continue
+            old_seconds = before["stages"][name]["seconds"]
+            ratio = stage["seconds"] / old_seconds if old_seconds else float("inf")
+            print(f"{entry['kind']:>10} {entry['struts']:>8} {name:<20} {old_seconds:10.4f}s -> {stage['seconds']:10.4f}s  x{ratio:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", default=sorted(lattices.GENERATORS), choices=sorted(lattices.GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES), help="target strut counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check-limit", type=int, default=5000, help="largest lattice checked against the original code")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes of the parallel weighting run, 0 skips it")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="print the stage times against this earlier JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    failed = False
+    for kind in args.kinds:
+        for size in args.sizes:
+            lines, points = lattices.lattice_for_struts(kind, size, args.seed)
+            entry = {"kind": kind, "struts": size, "lines": len(lines), "nodes": len(points)}
+            entry["stages"] = time_stages(lines, points)
+            if not args.no_memory:
+                for name, peak in memory_stages(lines, points).items():
+                    entry["stages"][name]["peak_bytes"] = peak
+            entry["reference"] = check_reference(lines, points) if len(lines) <= args.check_limit else None
+            if entry["reference"] is not None and not all(entry["reference"].values()):
+                failed = True
+            entry["streaming"] = band_overhead(lines)
+            if args.workers:
+                entry["parallel"] = time_parallel(lines, args.workers)
+                failed = failed or not entry["parallel"]["same"]
+
+            total = sum(stage["seconds"] for stage in entry["stages"].values())
+            print(f"{kind:>10} {len(lines):>8} lines  {total:8.3f}s  reference: {entry['reference']}")
+            streaming = entry["streaming"]
+            print(f"{'':>10} streamed in {streaming['bands']} bands  {streaming['seconds_per_band']:8.4f}s per band, "
+                  f"{streaming['halo_seconds_per_band']:.4f}s finding the halo  "
+                  f"halo x{streaming['halo_lines_per_band_line']:.2f} of the band  "
+                  f"{streaming['records_reused']:.0%} records reused")
+            if args.workers:
+                parallel = entry["parallel"]
+                print(f"{'':>10} weighting on {parallel['workers']} workers  {parallel['serial_seconds']:8.3f}s -> "
+                      f"{parallel['parallel_seconds']:8.3f}s  x{parallel['speedup']:.2f}  same: {parallel['same']}")
+            results.append(entry)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"python": sys.version, "platform": platform.platform(), "results": results}, output_file, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""
+Line weighting, ordering and combining for spatial printing toolpaths.
+
+The package only uses plain Python geometry (see geometry.py) so it runs
+outside Rhino. rhino_adapter converts to and from RhinoCommon inside
+Grasshopper.
+"""
+
+from .background import BackgroundSort, CancelToken, JobResult, SortCancelled, SortProgress, sort_lines
+from .cache import ResultCache, SortingResult, cached_result, compute_result, geometry_key
+from .combining import combine_lines, remove_overlapping_lines
+from .components import connected_components, order_components
+from .geometry import Line, Point, Vector, coordinates_line, line_coordinates
+from .graph import CSRGraph, build_graph
+from .incremental import IncrementalSession
+from .index import POINT_TOLERANCE, EndpointIndex, LineRecord, line_records, point_key, snapped_key
+from .instrumentation import NULL_INSTRUMENTATION, CountingIndex, Instrumentation, NullInstrumentation
+from .lattice import Lattice, lattice_from_lines, lattice_graph, load_lattice, weight_lattice, write_lattice
+from .parallel import add_weight_to_lines_parallel
+from .rules import DEFAULT_RULE_SET, DEFAULT_RULES, RuleSet, WeightRule, calculate_weight, compare_rule_sets
+from .sequencing import nearest_neighbor_order, sequence_segments, split_segments, travel_distance, two_opt
+from .solve_cache import SolveCache, SolveState
+from .spatial_hash import SpatialHash, endpoint_hash, lines_at, point_hash
+from .streaming import band_points, iter_band_order
+from .traversal import iter_dfs_edge_ids, iter_dfs_edges, iter_ordered_edge_ids, iter_trail_edge_ids, iter_weighted_edge_ids, order_lines
+from .weighting import add_weight_to_lines
+from .weighting_numpy import add_weight_to_lines_numpy, line_endpoint_array, weight_array
@@ -0,0 +1,265 @@
+"""
+Sorting on a worker thread with progress, cancellation and a time budget.
+
+The job checks a CancelToken between stages and every CHECK_INTERVAL
+lines, points or edges within them, the way
+GraphLongestTrail.FindLongestTrail checks its CancellationToken, but a
+job that is cancelled or runs out of time hands back the weights and the
+print order found so far instead of nothing. The lines are weighted
+before the graph is built, so a stop in the graph build keeps the
+weights. The setup of the weighted and trail traversals and of
+combining, and the overlap removal after combining, run between two
+checks. Combining is optional and runs last, so a stop while combining
+still hands back the whole print order.
+
+Inside Grasshopper keep the BackgroundSort in scriptcontext.sticky, let
+on_done schedule a new solution with ghdoc.ScheduleSolution and read the
+result on that solve, so the Rhino UI stays responsive meanwhile.
+"""
+
+import threading
+import time
+
+from .combining import iter_combined_lines, remove_overlapping_lines
+from .geometry import Line
+from .graph import build_graph
+from .index import POINT_TOLERANCE, EndpointIndex, LineRecord, snapped_key
+from .spatial_hash import CHECK_INTERVAL
+from .traversal import iter_ordered_edge_ids
+from .weighting import line_weight
+
+
+class SortCancelled(Exception):
+    """
+    Raised inside a job when its token is cancelled or its time budget is spent.
+    """
+
+
+class CancelToken(object):
+    """
+    Cooperative cancellation flag with an optional deadline.
+
+    Parameters:
+    time_budget (float): Seconds from now after which the token counts as cancelled. Can be None.
+    """
+
+    def __init__(self, time_budget=None):
+        self._event = threading.Event()
+        self.deadline = None if time_budget is None else time.monotonic() + time_budget
+        self.timed_out = False
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.timed_out = True
+            return True
+        return False
+
+    def check(self):
+        if self.cancelled:
+            raise SortCancelled()
+
+
+class SortProgress(object):
+    """
+    Counters a job updates as it goes, safe to read from any thread.
+
+    Parameters:
+    line_count (int): Number of lines in the job.
+    """
+
+    def __init__(self, line_count):
+        self.stage = "waiting"
+        self.line_count = line_count
+        self.lines_weighted = 0
+        self.edges_ordered = 0
+        self.lines_combined = 0
+
+    def snapshot(self):
+        return {
+            "stage": self.stage,
+            "line_count": self.line_count,
+            "lines_weighted": self.lines_weighted,
+            "edges_ordered": self.edges_ordered,
+            "lines_combined": self.lines_combined,
+        }
+
+
+class JobResult(object):
+    """
+    Outcome of a sort that may have stopped early.
+
+    Parameters:
+    ordered_lines (list): Lines in print order, only the ones ordered before a stop.
+    ordered_weights (list): Weight of every ordered line.
+    weights (list): Weight of every input line by line id, None for lines not weighted before a stop.
+    complete (bool): Whether every stage ran to the end.
+    timed_out (bool): Whether the time budget stopped the job.
+    combined_lines (list): Combined lines without the overlaps, None unless combining ran to the end.
+    combined_weights (list): Weight of every combined line, None unless combining ran to the end.
+    """
+
+    def __init__(self, ordered_lines, ordered_weights, weights, complete, timed_out=False, combined_lines=None, combined_weights=None):
+        self.ordered_lines = ordered_lines
+        self.ordered_weights = ordered_weights
+        self.weights = weights
+        self.complete = complete
+        self.timed_out = timed_out
+        self.combined_lines = combined_lines
+        self.combined_weights = combined_weights
+
+
+def sort_lines(lines, points, token=None, progress=None, by_weight=False, by_trails=False, tolerance=POINT_TOLERANCE, combine=False):
+    """
+    Weight the lines, build the graph, order and optionally combine them, stopping when the token is cancelled.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects.
+    token (CancelToken): Checked every CHECK_INTERVAL lines, points or edges. Can be None.
+    progress (SortProgress): Updated with the stage and the lines weighted and edges ordered. Can be None.
+    by_weight (bool): Order with iter_weighted_edge_ids.
+    by_trails (bool): Order with iter_trail_edge_ids.
+    tolerance (float): Distance within which a line end snaps to a point, and endpoints share a node of the rules.
+    combine (bool): Also combine the weighted lines and remove the overlaps,
+    like combine_lines and remove_overlapping_lines.
+
+    Returns:
+    JobResult: The print order, complete or as far as it got.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+    if token is None:
+        token = CancelToken()
+    if progress is None:
+        progress = SortProgress(len(lines))
+
+    weight_values = [None] * len(lines)
+    ordered_lines = []
+    ordered_weights = []
+    new_lines = []
+    new_weights = []
+    try:
+        progress.stage = "indexing"
+        key = snapped_key(tolerance)
+        records = []
+        for first in range(0, len(lines), CHECK_INTERVAL):
+            token.check()
+            records.extend(LineRecord(line, key) for line in lines[first:first + CHECK_INTERVAL])
+        index = EndpointIndex(lines, records, check=token.check)
+
+        progress.stage = "weighting"
+        for line_id in range(len(lines)):
+            if not line_id % CHECK_INTERVAL:
+                token.check()
+                progress.lines_weighted = line_id
+            weight_values[line_id] = line_weight(line_id, index)
+        progress.lines_weighted = len(lines)
+
+        progress.stage = "graph"
+        graph, missing_lines = build_graph(lines, points, tolerance, check=token.check)
+        for line_id, weight in enumerate(weight_values):
+            graph.weight[line_id] = weight
+
+        progress.stage = "ordering"
+        for order, start_index, end_index, edge_id in iter_ordered_edge_ids(graph, points, by_weight=by_weight, by_trails=by_trails):
+            if not order % CHECK_INTERVAL:
+                token.check()
+                progress.edges_ordered = order
+            ordered_lines.append(Line(points[start_index], points[end_index]))
+            ordered_weights.append(graph.weight[edge_id])
+        progress.edges_ordered = len(ordered_lines)
+
+        combined_lines = None
+        combined_weights = None
+        if combine:
+            progress.stage = "combining"
+            for line_id, (new_line, new_weight) in enumerate(iter_combined_lines(records, weight_values)):
+                if not line_id % CHECK_INTERVAL:
+                    token.check()
+                    progress.lines_combined = line_id
+                new_lines.append(new_line)
+                new_weights.append(new_weight)
+            progress.lines_combined = len(new_lines)
+            token.check()
+            combined_lines, combined_weights = remove_overlapping_lines(new_lines, new_weights)
+    except SortCancelled:
+        #the counters are only updated at the checks, set them to how far the job got
+        progress.lines_weighted = len(lines) - weight_values.count(None)
+        progress.edges_ordered = len(ordered_lines)
+        progress.lines_combined = len(new_lines)
+        progress.stage = "timed out" if token.timed_out else "cancelled"
+        return JobResult(ordered_lines, ordered_weights, weight_values, False, token.timed_out)
+
+    progress.stage = "done"
+    return JobResult(ordered_lines, ordered_weights, weight_values, True, combined_lines=combined_lines, combined_weights=combined_weights)
+
+
+class BackgroundSort(object):
+    """
+    Run sort_lines on a daemon thread, starting right away.
+
+    The thread shares the interpreter with the caller, so it does not sort
+    any faster, it only keeps the calling thread free.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects.
+    time_budget (float): Seconds the job may run before it stops with what it has. Can be None.
+    by_weight (bool): Order with iter_weighted_edge_ids.
+    by_trails (bool): Order with iter_trail_edge_ids.
+    tolerance (float): Distance within which a line end snaps to a point, and endpoints share a node of the rules.
+    combine (bool): Also combine the weighted lines, see sort_lines.
+    on_done (callable): Called on the worker thread with the BackgroundSort once done is True. Can be None.
+    """
+
+    def __init__(self, lines, points, time_budget=None, by_weight=False, by_trails=False, tolerance=POINT_TOLERANCE, on_done=None, combine=False):
+        self.token = CancelToken(time_budget)
+        self.progress = SortProgress(len(lines))
+        self._result = None
+        self._error = None
+        self._on_done = on_done
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(lines, points, by_weight, by_trails, tolerance, combine), name="spatial-sorting")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, lines, points, by_weight, by_trails, tolerance, combine):
+        try:
+            self._result = sort_lines(lines, points, self.token, self.progress, by_weight, by_trails, tolerance, combine)
+        except Exception as error:
+            self.progress.stage = "failed"
+            self._error = error
+        #set before on_done, so the callback already sees the job as done
+        self._finished.set()
+        if self._on_done is not None:
+            self._on_done(self)
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    def cancel(self):
+        #ask the job to stop at its next check, wait() then gives the order found so far
+        self.token.cancel()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to end.
+
+        Parameters:
+        timeout (float): Seconds to wait at most, forever when None.
+
+        Returns:
+        JobResult: The result, None when the job is still running after timeout.
+        """
+        if not self._finished.wait(timeout):
+            return None
+        if self._error is not None:
+            raise self._error
+        return self._result
@@ -0,0 +1,260 @@
+"""
+On-disk cache of weights, combined lines and print order, keyed by the geometry they came from.
+"""
+
+from array import array
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+from .combining import MAX_COMBINED_LENGTH, OVERLAP_LENGTH, VERTICAL_JOINT_WEIGHT, combine_lines, remove_overlapping_lines
+from .geometry import Line, Point
+from .graph import build_graph
+from .index import FLAT_TOLERANCE, POINT_TOLERANCE, EndpointIndex
+from .rules import (ANGLED_AT_END_WEIGHT, ANGLED_AT_START_WEIGHT, NO_ANGLE_AT_TOP_WEIGHT, VERTICAL_AT_END_WEIGHT,
+                    VERTICAL_AT_START_WEIGHT, Z_OFFSET)
+from .traversal import iter_dfs_edge_ids
+from .weighting import line_weight
+
+#every constant the cached results depend on, a change gives new cache keys
+RULE_PARAMETERS = (VERTICAL_AT_START_WEIGHT, VERTICAL_AT_END_WEIGHT, ANGLED_AT_START_WEIGHT, ANGLED_AT_END_WEIGHT,
+                   NO_ANGLE_AT_TOP_WEIGHT, VERTICAL_JOINT_WEIGHT, FLAT_TOLERANCE, OVERLAP_LENGTH,
+                   MAX_COMBINED_LENGTH, Z_OFFSET, POINT_TOLERANCE)
+
+#file layout: magic, line count, combined line count, order length, then the arrays
+_MAGIC = b"SSRC0002"
+_HEADER = struct.Struct("<8sQQQ")
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def geometry_key(lines, points=(), parameters=RULE_PARAMETERS):
+    """
+    Stable hash of the lines, in list order, the graph points and the rule parameters.
+
+    The coordinates are hashed exactly: the rules test endpoints for exact
+    equality as well as on the 0.01 grid, so any coarser quantization
+    could map geometry with different results to the same key.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects the graph is built from.
+    parameters (tuple): Rule parameters, RULE_PARAMETERS by default.
+
+    Returns:
+    str: Hex digest used as the cache key.
+    """
+    coordinates = array("d")
+    for line in lines:
+        coordinates.extend((line.From.X, line.From.Y, line.From.Z, line.To.X, line.To.Y, line.To.Z))
+    point_coordinates = array("d")
+    for pt in points:
+        point_coordinates.extend((pt.X, pt.Y, pt.Z))
+
+    digest = hashlib.sha256(_MAGIC)
+    digest.update(struct.pack("<QQ", len(lines), len(points)))
+    digest.update(_little_endian(coordinates).tobytes())
+    digest.update(_little_endian(point_coordinates).tobytes())
+    digest.update(_little_endian(array("d", parameters)).tobytes())
+    return digest.hexdigest()
+
+
+class SortingResult(object):
+    """
+    Everything computed for one set of lines.
+
+    Parameters:
+    weights (list): Weight of each input line.
+    combined_lines (list): Lines left after combine_lines and remove_overlapping_lines.
+    combined_weights (list): Weight of each combined line.
+    order (list): (start index, end index, edge id) of each edge in print order.
+    """
+
+    __slots__ = ("weights", "combined_lines", "combined_weights", "order")
+
+    def __init__(self, weights, combined_lines, combined_weights, order):
+        self.weights = weights
+        self.combined_lines = combined_lines
+        self.combined_weights = combined_weights
+        self.order = order
+
+    def ordered_lines(self, points):
+        #the lines and weights order_lines returns
+        ordered_lines = [Line(points[start_index], points[end_index]) for start_index, end_index, edge_id in self.order]
+        ordered_weights = [self.weights[edge_id] for start_index, end_index, edge_id in self.order]
+        return ordered_lines, ordered_weights
+
+    def to_bytes(self):
+        line_coordinates = array("d")
+        for line in self.combined_lines:
+            line_coordinates.extend((line.From.X, line.From.Y, line.From.Z, line.To.X, line.To.Y, line.To.Z))
+        order = array("i")
+        for edge in self.order:
+            order.extend(edge)
+
+        return b"".join((
+            _HEADER.pack(_MAGIC, len(self.weights), len(self.combined_lines), len(self.order)),
+            _little_endian(array("d", self.weights)).tobytes(),
+            _little_endian(line_coordinates).tobytes(),
+            _little_endian(array("d", self.combined_weights)).tobytes(),
+            _little_endian(order).tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, line_count, combined_count, order_count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a cached sorting result")
+
+        def read(typecode, count, offset):
+            values = array(typecode)
+            values.frombytes(data[offset:offset + count * values.itemsize])
+            if len(values) != count:
+                raise ValueError("Cached sorting result is truncated")
+            return _little_endian(values), offset + count * values.itemsize
+
+        weights, offset = read("d", line_count, _HEADER.size)
+        line_coordinates, offset = read("d", combined_count * 6, offset)
+        combined_weights, offset = read("d", combined_count, offset)
+        order, offset = read("i", order_count * 3, offset)
+
+        c = line_coordinates
+        combined_lines = [Line(Point(c[i], c[i + 1], c[i + 2]), Point(c[i + 3], c[i + 4], c[i + 5]))
+                          for i in range(0, len(c), 6)]
+        order = [tuple(order[i:i + 3]) for i in range(0, len(order), 3)]
+        return cls(weights.tolist(), combined_lines, combined_weights.tolist(), order)
+
+
+class ResultCache(object):
+    """
+    Directory of SortingResult files, evicting the least recently used ones above a size limit.
+
+    Parameters:
+    directory (str): Folder holding the cache files, created when missing.
+    max_bytes (int): Total size the cache files are trimmed to after every put.
+    """
+
+    SUFFIX = ".ssrc"
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def get(self, key):
+        """
+        Load a cached result and mark it as recently used.
+
+        Parameters:
+        key (str): Key from geometry_key.
+
+        Returns:
+        SortingResult: The cached result, or None when there is none.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                data = cache_file.read()
+            os.utime(path, None)
+        except OSError:
+            return None
+
+        try:
+            return SortingResult.from_bytes(data)
+        except (ValueError, struct.error):
+            #a file left by a crash or another version, compute again
+            os.remove(path)
+            return None
+
+    def put(self, key, result):
+        #write next to the final file and rename, so readers never see half a file
+        handle, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as cache_file:
+                cache_file.write(result.to_bytes())
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        #drop the least recently used files until the cache fits in max_bytes
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for mtime, size, name in entries)
+        for mtime, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+
+def compute_result(lines, points, index=None, graph=None):
+    """
+    Weight, combine and order the lines without any caching.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects the graph is built from.
+    index (EndpointIndex): Optional prebuilt index of lines, built here when omitted.
+    graph (CSRGraph): Optional graph of the lines with their weights filled in, built and weighted here when omitted.
+
+    Returns:
+    SortingResult: The weights, combined lines and print order.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+
+    if index is None:
+        index = EndpointIndex(lines, tolerance=POINT_TOLERANCE)
+    if graph is None:
+        weights = [line_weight(line_id, index) for line_id in range(len(lines))]
+    else:
+        weights = graph.weight.tolist()
+
+    combined_lines, combined_weights = combine_lines(lines, weights, index.records)
+    remove_overlapping_lines(combined_lines, combined_weights)
+
+    if graph is None:
+        graph, missing_lines = build_graph(lines, points, POINT_TOLERANCE)
+    order = [(start_index, end_index, edge_id) for order, start_index, end_index, edge_id in iter_dfs_edge_ids(graph)]
+    return SortingResult(weights, combined_lines, combined_weights, order)
+
+def cached_result(lines, points, cache):
+    """
+    Load the result for the lines from the cache, computing and storing it on a miss.
+
+    Parameters:
+    lines (list): List of Line objects.
+    points (list): List of Point objects the graph is built from.
+    cache (ResultCache): Cache to read and fill.
+
+    Returns:
+    SortingResult: The weights, combined lines and print order.
+    """
+    key = geometry_key(lines, points)
+    result = cache.get(key)
+    if result is None:
+        result = compute_result(lines, points)
+        cache.put(key, result)
+    return result
@@ -0,0 +1,184 @@
+"""
+Combining of collinear line chains into single print lines.
+"""
+
+from .geometry import Line
+from .index import HORIZONTAL, line_records
+from .instrumentation import NULL_INSTRUMENTATION
+
+#combined lines stay shorter than this
+MAX_COMBINED_LENGTH = 40
+#lines shorter than this can be removed as overlaps of lines longer than it
+OVERLAP_LENGTH = 20
+#added to the weight of a line combined with a vertical line
+VERTICAL_JOINT_WEIGHT = .13
+
+
+def horizontal_endpoint_keys(records):
+    #keys of every point that a horizontal line is attached to
+    keys = set()
+    for record in records:
+        if record.orientation == HORIZONTAL:
+            keys.add(record.start_key)
+            keys.add(record.end_key)
+    return keys
+
+def combine_lines(crvs, weights, records=None, instrumentation=NULL_INSTRUMENTATION, tolerance=None):
+    """
+    Join lines that continue each other on the same vector into one longer line.
+
+    Each line looks up the lines starting at its end point with the same
+    rounded direction, and is joined to the first of them in list order
+    whose joint has no horizontal line attached and whose combined length
+    stays under 40.
+
+    Parameters:
+    crvs (list): List of Line objects, left unchanged.
+    weights (list): Weight of each line in crvs.
+    records (list): Optional LineRecord of each line, computed here when omitted.
+    instrumentation (Instrumentation): Receives the stage time and the number of joined lines.
+    tolerance (float): Optional snapping distance for the records computed here, see EndpointIndex.
+
+    Returns:
+    tuple: The combined bottom-to-top lines and their weights.
+    """
+    with instrumentation.stage("combine"):
+        if records is None:
+            records = line_records(crvs, tolerance)
+
+        new_lines = []
+        new_weights = []
+        for new_line, new_weight in iter_combined_lines(records, weights):
+            new_lines.append(new_line)
+            new_weights.append(new_weight)
+
+        if instrumentation.enabled:
+            instrumentation.count("lines_combined", sum(1 for i, record_a in enumerate(records) if new_lines[i] is not record_a.line))
+    return new_lines, new_weights
+
+def iter_combined_lines(records, weights):
+    """
+    Yield the combined line and weight of every line in list order, see combine_lines.
+
+    Parameters:
+    records (list): LineRecord of each line.
+    weights (list): Weight of each line.
+
+    Returns:
+    generator: (line, weight) tuples, one per input line.
+    """
+    #lines by the key of their start point and their direction
+    successors = {}
+    for j, record_b in enumerate(records):
+        successors.setdefault((record_b.start_key, record_b.direction_key), []).append(j)
+    horizontal_keys = horizontal_endpoint_keys(records)
+
+    for i in range(len(records)):
+        yield combine_line(i, records, weights, successors, horizontal_keys)
+
+def combine_line(i, records, weights, successors, horizontal_keys):
+    """
+    Combined line and weight of one line, see combine_lines.
+
+    Parameters:
+    i (int): Id of the line.
+    records (list): LineRecord of each line, by id.
+    weights (list): Weight of each line, by id.
+    successors (dict): Ids in list order by (start key, direction key).
+    horizontal_keys (set): Keys of the points a horizontal line is attached to.
+
+    Returns:
+    tuple: The line, joined with its successor when there is one, and its weight.
+    """
+    record_a = records[i]
+
+    #line b starts on the end point of line a, so one horizontal test covers both
+    if record_a.end_key not in horizontal_keys:
+        for j in successors.get((record_a.end_key, record_a.direction_key), ()):
+            record_b = records[j]
+            dist = abs(record_a.start.DistanceTo(record_b.end))
+            if dist >= MAX_COMBINED_LENGTH:
+                continue
+
+            #determine if the currnet line is vertical or angled to add weight
+            if record_b.round_vertical:
+                return Line(record_a.start, record_b.end), weights[j] + VERTICAL_JOINT_WEIGHT
+            return Line(record_a.start, record_b.end), weights[j]
+
+    return record_a.line, weights[i]
+
+def remove_overlapping_lines(new_lines, new_weights, records=None, instrumentation=NULL_INSTRUMENTATION, tolerance=None):
+    """
+    Remove the short lines that overlap one of the combined lines, in place.
+
+    A line shorter than 20 is removed when it is angled, runs in the same
+    rounded direction as a line longer than 20, has its start, end or
+    midpoint on the midpoint, start or end of the long line, and ends
+    where the long line ends. Removals are marked by line id and the lists
+    are compacted once at the end.
+
+    Parameters:
+    new_lines (list): List of Line objects from combine_lines.
+    new_weights (list): Weight of each line in new_lines.
+    records (list): Optional LineRecord of each line, computed here when omitted.
+    instrumentation (Instrumentation): Receives the stage time and the number of removed lines.
+    tolerance (float): Optional snapping distance for the records computed here, see EndpointIndex.
+
+    Returns:
+    tuple: new_lines and new_weights.
+    """
+    with instrumentation.stage("dedupe"):
+        if records is None:
+            records = line_records(new_lines, tolerance)
+        _remove_overlapping_lines(new_lines, new_weights, records, instrumentation)
+    return new_lines, new_weights
+
+def _remove_overlapping_lines(new_lines, new_weights, records, instrumentation):
+    #short angled lines that can be removed, by the keys of their start, end and midpoint
+    starts = {}
+    ends = {}
+    mids = {}
+    for j, record_b in enumerate(records):
+        if not removable(record_b):
+            continue
+        starts.setdefault(record_b.start_key, []).append(j)
+        ends.setdefault(record_b.end_key, []).append(j)
+        mids.setdefault(record_b.midpoint_key, []).append(j)
+
+    deleted = [False] * len(new_lines)
+    for i, record_a in enumerate(records):
+        if record_a.length <= OVERLAP_LENGTH:
+            continue
+        #test for a mid point connection and a start or end point connection
+        candidates = set(starts.get(record_a.midpoint_key, ()))
+        candidates.update(ends.get(record_a.midpoint_key, ()))
+        candidates.update(mids.get(record_a.start_key, ()))
+        candidates.update(mids.get(record_a.end_key, ()))
+        for j in candidates:
+            if not deleted[j] and overlaps(record_a, records[j]):
+                deleted[j] = True
+
+    if instrumentation.enabled:
+        instrumentation.count("overlaps_removed", sum(deleted))
+    new_lines[:] = [line for j, line in enumerate(new_lines) if not deleted[j]]
+    new_weights[:] = [weight for j, weight in enumerate(new_weights) if not deleted[j]]
+
+def removable(record):
+    #only short angled lines are removed as overlaps
+    return record.length < OVERLAP_LENGTH and record.orientation != HORIZONTAL and not record.round_vertical
+
+def overlaps(record_a, record_b):
+    """
+    Test if line b overlaps the end of line a, once a midpoint of one is known to sit on the other.
+
+    Parameters:
+    record_a (LineRecord): The long line.
+    record_b (LineRecord): The short line.
+
+    Returns:
+    bool: True if line b should be removed.
+    """
+    if record_a.length <= OVERLAP_LENGTH or not removable(record_b) or record_b.direction_key != record_a.direction_key:
+        return False
+    #the second test compares the start X with the end Y and Z, like the original branches did
+    return record_a.end_key == record_b.end_key or (record_a.start_key[0] == record_b.start_key[0] and record_a.end_key[1:] == record_b.end_key[1:])
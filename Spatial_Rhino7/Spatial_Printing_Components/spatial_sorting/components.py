@@ -0,0 +1,137 @@
+"""
+Connected lattice islands, weighted and ordered one per task on a process pool.
+
+The weight rules only read lines sharing an endpoint key with the line
+being scored, so a component weighted on its own gets exactly the weights
+add_weight_to_lines gives it in the whole list. Components are handed out
+lowest first, which keeps the result independent of how the pool
+schedules them.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .geometry import coordinates_line, line_coordinates
+from .graph import build_graph
+from .index import POINT_TOLERANCE, EndpointIndex, point_key
+from .spatial_hash import SpatialHash
+from .streaming import band_points
+from .traversal import order_lines
+from .weighting import line_weight
+
+
+def connected_components(lines, tolerance=POINT_TOLERANCE):
+    """
+    Split the lines into connected components with a union-find pass over the line list.
+
+    Two lines are connected when they share a 0.01 endpoint key, which the
+    weight rules read, or when their endpoints are within tolerance, which
+    build_graph snaps together.
+
+    Parameters:
+    lines (list): List of Line objects.
+    tolerance (float): Distance within which two endpoints are the same node.
+
+    Returns:
+    list: One list of line ids per component, each in input order, the
+    component with the lowest endpoint first and ties in input order.
+    """
+    parent = list(range(len(lines)))
+
+    def find(line_id):
+        while parent[line_id] != line_id:
+            parent[line_id] = parent[parent[line_id]]
+            line_id = parent[line_id]
+        return line_id
+
+    def union(line_id, other_id):
+        root = find(line_id)
+        other_root = find(other_id)
+        if root != other_root:
+            #the lower id stays the root, so roots are the first line of their component
+            if other_root < root:
+                root, other_root = other_root, root
+            parent[other_root] = root
+
+    first_at_key = {}
+    grid = SpatialHash(tolerance)
+    for line_id, line in enumerate(lines):
+        for pt in (line.From, line.To):
+            union(line_id, first_at_key.setdefault(point_key(pt), line_id))
+            other_id = grid.first_within(pt)
+            if other_id is None:
+                grid.add(pt, line_id)
+            else:
+                union(line_id, other_id)
+
+    components = {}
+    bottoms = {}
+    for line_id, line in enumerate(lines):
+        root = find(line_id)
+        components.setdefault(root, []).append(line_id)
+        bottom = min(line.From.Z, line.To.Z)
+        if root not in bottoms or bottom < bottoms[root]:
+            bottoms[root] = bottom
+    return [components[root] for root in sorted(components, key=lambda root: (bottoms[root], root))]
+
+def _order_component(task):
+    #worker: weight and order one component, returning plain coordinates
+    coordinates, tolerance, by_weight, by_trails = task
+    ordered_lines, ordered_weights = _order_lines([coordinates_line(c) for c in coordinates], tolerance, by_weight, by_trails)
+    return [line_coordinates(line) for line in ordered_lines], ordered_weights
+
+def _order_lines(lines, tolerance, by_weight, by_trails):
+    #weight and order the lines of one component
+    index = EndpointIndex(lines, tolerance=tolerance)
+    points = band_points(lines, tolerance)
+    graph, missing_lines = build_graph(lines, points, tolerance)
+    for line_id in range(len(lines)):
+        graph.weight[line_id] = line_weight(line_id, index)
+    return order_lines(graph, points, by_weight=by_weight, by_trails=by_trails)
+
+def order_components(lines, workers=None, by_weight=False, by_trails=False, tolerance=POINT_TOLERANCE):
+    """
+    Weight and order every connected component on its own, one component per task.
+
+    Parameters:
+    lines (list): List of Line objects.
+    workers (int): Number of processes, defaults to the number of cores. 1 runs in this process.
+    by_weight (bool): Order each component with iter_weighted_edge_ids.
+    by_trails (bool): Order each component with iter_trail_edge_ids.
+    tolerance (float): Distance within which two endpoints are the same node.
+
+    Returns:
+    tuple: The lines in print order, component after component lowest first, and their weights.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+
+    workers = workers or os.cpu_count() or 1
+    components = connected_components(lines, tolerance)
+    if workers == 1 or len(components) == 1:
+        #nothing to hand out, order the lines themselves without the coordinate round trip
+        ordered_lines = []
+        ordered_weights = []
+        for component in components:
+            component_lines, component_weights = _order_lines([lines[line_id] for line_id in component], tolerance,
+                                                              by_weight, by_trails)
+            ordered_lines.extend(component_lines)
+            ordered_weights.extend(component_weights)
+        return ordered_lines, ordered_weights
+
+    tasks = []
+    for component in components:
+        tasks.append(([line_coordinates(lines[line_id]) for line_id in component], tolerance, by_weight, by_trails))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        #many small islands go out in batches so each task is worth the round trip
+        chunk_size = max(1, len(tasks) // (workers * 4))
+        return _concatenate(executor.map(_order_component, tasks, chunksize=chunk_size))
+
+def _concatenate(results):
+    #join the component results in task order
+    ordered_lines = []
+    ordered_weights = []
+    for coordinates, weights in results:
+        ordered_lines.extend(coordinates_line(c) for c in coordinates)
+        ordered_weights.extend(weights)
+    return ordered_lines, ordered_weights
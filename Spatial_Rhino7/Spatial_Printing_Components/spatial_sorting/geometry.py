@@ -0,0 +1,117 @@
+"""
+Minimal point and line types with the RhinoCommon semantics the sorter relies on.
+
+Only the members used by the weighting, graph and combining code are
+implemented: X/Y/Z on points, and From/To/Flip/PointAtLength/Length on
+lines. Lines compare and hash by value like Rhino.Geometry.Line, so they
+can be used as dictionary keys the same way. line_coordinates and
+coordinates_line turn a line into a plain tuple and back, which is how
+lines are sent to worker processes.
+"""
+
+import math
+
+
+class Point(object):
+    __slots__ = ("X", "Y", "Z")
+
+    def __init__(self, x, y, z):
+        self.X = float(x)
+        self.Y = float(y)
+        self.Z = float(z)
+
+    def __eq__(self, other):
+        return isinstance(other, Point) and self.X == other.X and self.Y == other.Y and self.Z == other.Z
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.X, self.Y, self.Z))
+
+    def __sub__(self, other):
+        return Vector(self.X - other.X, self.Y - other.Y, self.Z - other.Z)
+
+    def __repr__(self):
+        return "Point({!r}, {!r}, {!r})".format(self.X, self.Y, self.Z)
+
+    def DistanceTo(self, other):
+        return math.sqrt((self.X - other.X) ** 2 + (self.Y - other.Y) ** 2 + (self.Z - other.Z) ** 2)
+
+
+class Vector(Point):
+    __slots__ = ()
+
+    def __repr__(self):
+        return "Vector({!r}, {!r}, {!r})".format(self.X, self.Y, self.Z)
+
+    @property
+    def Length(self):
+        return math.sqrt(self.X * self.X + self.Y * self.Y + self.Z * self.Z)
+
+    def Unitized(self):
+        #a zero vector stays zero instead of failing like rs.VectorUnitize
+        length = self.Length
+        if length == 0:
+            return Vector(0, 0, 0)
+        return Vector(self.X / length, self.Y / length, self.Z / length)
+
+
+class Line(object):
+    __slots__ = ("From", "To")
+
+    def __init__(self, start_point, end_point):
+        self.From = Point(start_point.X, start_point.Y, start_point.Z)
+        self.To = Point(end_point.X, end_point.Y, end_point.Z)
+
+    def __eq__(self, other):
+        return isinstance(other, Line) and self.From == other.From and self.To == other.To
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.From, self.To))
+
+    def __repr__(self):
+        return "Line({!r}, {!r})".format(self.From, self.To)
+
+    @property
+    def Length(self):
+        return self.From.DistanceTo(self.To)
+
+    def Flip(self):
+        #swap the endpoints in place like Rhino.Geometry.Line.Flip
+        self.From, self.To = self.To, self.From
+
+    def PointAtLength(self, distance):
+        length = self.Length
+        t = distance / length if length else 0.0
+        return Point(self.From.X + (self.To.X - self.From.X) * t,
+                     self.From.Y + (self.To.Y - self.From.Y) * t,
+                     self.From.Z + (self.To.Z - self.From.Z) * t)
+
+
+def line_coordinates(line):
+    """
+    Plain tuple of the endpoint coordinates of a line, cheap to pickle.
+
+    Parameters:
+    line (Line): Any object with From and To points, RhinoCommon lines included.
+
+    Returns:
+    tuple: X, Y and Z of the start point, then of the end point.
+    """
+    return (line.From.X, line.From.Y, line.From.Z, line.To.X, line.To.Y, line.To.Z)
+
+def coordinates_line(coordinates):
+    """
+    The line back from line_coordinates.
+
+    Parameters:
+    coordinates (tuple): X, Y and Z of the start point, then of the end point.
+
+    Returns:
+    Line: The line between the two points.
+    """
+    return Line(Point(*coordinates[:3]), Point(*coordinates[3:]))
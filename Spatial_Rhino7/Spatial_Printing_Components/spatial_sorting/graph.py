@@ -0,0 +1,139 @@
+"""
+Line graph used to order the lines for printing.
+"""
+
+from array import array
+
+from .index import EndpointIndex, line_orientation
+from .instrumentation import NULL_INSTRUMENTATION
+from .spatial_hash import CHECK_INTERVAL, point_hash
+
+
+class CSRGraph(object):
+    """
+    Compressed sparse row adjacency of the line graph.
+
+    The neighbors of vertex v are indices[indptr[v]:indptr[v + 1]] and the
+    line joining them is the matching entry of edge_id, so every line
+    appears twice, once from each end. Edge ids are positions in the input
+    line list and index the parallel weight, orientation and length arrays.
+
+    Parameters:
+    vertex_count (int): Number of graph points.
+    edge_ends (list): (start index, end index) per line, None for lines left out of the graph.
+    """
+
+    def __init__(self, vertex_count, edge_ends):
+        self.vertex_count = vertex_count
+        self.edge_count = len(edge_ends)
+
+        degree = array("l", [0]) * (vertex_count + 1)
+        for ends in edge_ends:
+            if ends is not None:
+                degree[ends[0] + 1] += 1
+                degree[ends[1] + 1] += 1
+        for v in range(vertex_count):
+            degree[v + 1] += degree[v]
+        self.indptr = degree
+
+        #fill in line order so every vertex keeps the neighbor order of the lines
+        fill = array("l", self.indptr)
+        self.indices = array("l", [0]) * self.indptr[vertex_count]
+        self.edge_id = array("l", self.indices)
+        for line_id, ends in enumerate(edge_ends):
+            if ends is None:
+                continue
+            start_index, end_index = ends
+            self.indices[fill[start_index]] = end_index
+            self.edge_id[fill[start_index]] = line_id
+            fill[start_index] += 1
+            self.indices[fill[end_index]] = start_index
+            self.edge_id[fill[end_index]] = line_id
+            fill[end_index] += 1
+
+        self.weight = array("d", [0.0]) * self.edge_count
+        self.orientation = array("b", [0]) * self.edge_count
+        self.length = array("d", [0.0]) * self.edge_count
+
+    @classmethod
+    def from_arrays(cls, vertex_count, edge_count, indptr, indices, edge_id):
+        """
+        Wrap CSR arrays that were already built, with zeroed edge data.
+
+        Parameters:
+        vertex_count (int): Number of graph points.
+        edge_count (int): Number of lines, the size of the edge data arrays.
+        indptr (array): Start of the neighbors of every vertex, vertex_count + 1 entries.
+        indices (array): Neighbor of every entry.
+        edge_id (array): Line of every entry.
+
+        Returns:
+        CSRGraph: The graph.
+        """
+        graph = cls(0, [])
+        graph.vertex_count = vertex_count
+        graph.edge_count = edge_count
+        graph.indptr = indptr
+        graph.indices = indices
+        graph.edge_id = edge_id
+        graph.weight = array("d", [0.0]) * edge_count
+        graph.orientation = array("b", [0]) * edge_count
+        graph.length = array("d", [0.0]) * edge_count
+        return graph
+
+    def degree(self, vertex):
+        return self.indptr[vertex + 1] - self.indptr[vertex]
+
+    def neighbors(self, vertex):
+        #(neighbor index, edge id) pairs of a vertex
+        first = self.indptr[vertex]
+        last = self.indptr[vertex + 1]
+        return zip(self.indices[first:last], self.edge_id[first:last])
+
+    def visited_bitmap(self):
+        #one byte per edge id, set to 1 once the edge is used
+        return bytearray(self.edge_count)
+
+
+def build_graph(graph_lines, graph_points, tolerance, instrumentation=NULL_INSTRUMENTATION, check=None):
+    """
+    Build the CSR graph of the lines in one pass over the lines.
+
+    Parameters:
+    graph_lines (list): List of Line objects.
+    graph_points (list): List of Point3d objects.
+    tolerance (float): Distance within which a line end snaps to the first point found.
+    instrumentation (Instrumentation): Receives the stage time and the missing line count.
+    check (function): Called every CHECK_INTERVAL points and lines, raises to stop the build. Can be None.
+
+    Returns:
+    tuple: The CSRGraph, and the indices of the lines whose start or end
+    point was not found.
+    """
+    with instrumentation.stage("graph"):
+        point_grid = point_hash(graph_points, tolerance, check)
+        edge_ends = []
+        missing_lines = []
+        for line_id, line in enumerate(graph_lines):
+            if check is not None and not line_id % CHECK_INTERVAL:
+                check()
+            start_index = point_grid.first_within(line.From)
+            end_index = point_grid.first_within(line.To)
+            if start_index is None or end_index is None:
+                missing_lines.append(line_id)
+                edge_ends.append(None)
+                continue
+            edge_ends.append((start_index, end_index))
+
+        if missing_lines:
+            print(f"{len(missing_lines)} lines have a start or end point not found in the points: {missing_lines}")
+
+        graph = CSRGraph(len(graph_points), edge_ends)
+        for line_id, line in enumerate(graph_lines):
+            if check is not None and not line_id % CHECK_INTERVAL:
+                check()
+            graph.orientation[line_id] = EndpointIndex.ORIENTATIONS.index(line_orientation(line))
+            graph.length[line_id] = line.Length
+
+        instrumentation.count("missing_lines", len(missing_lines))
+    return graph, missing_lines
@@ -0,0 +1,224 @@
+"""
+Incremental weighting, combining and overlap removal for interactive edits.
+"""
+
+from bisect import insort
+
+from .combining import combine_line, overlaps
+from .index import HORIZONTAL, VERTICAL, EndpointIndex, LineRecord
+from .weighting import line_weight
+
+
+class IncrementalSession(object):
+    """
+    Weights and combined lines of a set of lines, kept up to date as lines are edited.
+
+    Every line gets a stable id in the order it was added, and a moved line
+    keeps its id, so the results always match add_weight_to_lines,
+    combine_lines and remove_overlapping_lines run on lines() from scratch.
+    Edits only record which nodes changed; update() then recomputes the
+    weights around those nodes, the chains ending on them and the overlap
+    tests of the combined lines that changed.
+
+    Parameters:
+    lines (list): Optional List of Line objects to start with.
+    """
+
+    def __init__(self, lines=()):
+        self.records = {}
+        self.index = EndpointIndex([], self.records)
+        self.weights = {}
+        #combined LineRecord and weight of each line, and the ids removed as overlaps
+        self.combined = {}
+        self.combined_weights = {}
+        self.deleted = set()
+
+        self._successors = {}
+        self._horizontal_keys = {}
+        self._combined_starts = {}
+        self._combined_ends = {}
+        self._combined_mids = {}
+        self._next_id = 0
+        self._changed_ids = set()
+        self._changed_keys = set()
+
+        for line in lines:
+            self.add_line(line)
+        self.update()
+
+    def add_line(self, line):
+        """
+        Add a line, after every line already in the session.
+
+        Parameters:
+        line (Line): The line to add.
+
+        Returns:
+        int: The id of the new line.
+        """
+        line_id = self._next_id
+        self._next_id += 1
+        self._insert(line_id, LineRecord(line))
+        return line_id
+
+    def remove_line(self, line_id):
+        #remove a line, the other ids stay the same
+        self._discard(line_id)
+        self._changed_ids.add(line_id)
+
+    def move_line(self, line_id, line):
+        #replace the geometry of a line, it keeps its place in the list order
+        self._discard(line_id)
+        self._insert(line_id, LineRecord(line))
+
+    def _insert(self, line_id, record):
+        self.index.add(line_id, record)
+        insort(self._successors.setdefault((record.start_key, record.direction_key), []), line_id)
+        if record.orientation == HORIZONTAL:
+            for key in (record.start_key, record.end_key):
+                self._horizontal_keys[key] = self._horizontal_keys.get(key, 0) + 1
+        self._changed_ids.add(line_id)
+        self._changed_keys.update((record.start_key, record.end_key))
+
+    def _discard(self, line_id):
+        record = self.index.remove(line_id)
+        self._successors[(record.start_key, record.direction_key)].remove(line_id)
+        if record.orientation == HORIZONTAL:
+            for key in (record.start_key, record.end_key):
+                self._horizontal_keys[key] -= 1
+                if not self._horizontal_keys[key]:
+                    del self._horizontal_keys[key]
+        self._changed_keys.update((record.start_key, record.end_key))
+
+    def update(self):
+        """
+        Recompute everything the edits since the last update can have changed.
+
+        Returns:
+        set: Ids of the lines whose weight changed, including the added and moved lines.
+        """
+        records = self.records
+        index = self.index
+        changed_keys = self._changed_keys
+        changed_ids = self._changed_ids
+        self._changed_keys = set()
+        self._changed_ids = set()
+
+        #a weight reads the lines at both ends of its line, and the lines starting
+        #where a vertical line ending at its top starts
+        reweigh = set(line_id for line_id in changed_ids if line_id in records)
+        for key in changed_keys:
+            reweigh.update(index.starting_at(key))
+            reweigh.update(index.ending_at(key))
+            for vertical_id in index.starting_at(key, (VERTICAL, HORIZONTAL)):
+                if records[vertical_id].round_vertical:
+                    reweigh.update(index.ending_at(records[vertical_id].end_key))
+
+        reweighed = set()
+        for line_id in changed_ids:
+            if line_id not in records:
+                self.weights.pop(line_id, None)
+        for line_id in reweigh:
+            weight = line_weight(line_id, index)
+            if self.weights.get(line_id) != weight:
+                self.weights[line_id] = weight
+                reweighed.add(line_id)
+
+        #a combined line reads its own weight, the lines starting at its end point and their weights
+        chain_keys = set(changed_keys)
+        chain_keys.update(records[line_id].start_key for line_id in reweighed)
+        recombine = set(line_id for line_id in changed_ids if line_id in records)
+        recombine.update(reweighed)
+        for key in chain_keys:
+            recombine.update(index.ending_at(key))
+
+        moved = []
+        for line_id in changed_ids:
+            if line_id not in records and line_id in self.combined:
+                moved.append(self._unmap_combined(line_id))
+                del self.combined_weights[line_id]
+                self.deleted.discard(line_id)
+        for line_id in recombine:
+            new_line, new_weight = combine_line(line_id, records, self.weights, self._successors, self._horizontal_keys)
+            self.combined_weights[line_id] = new_weight
+            old_record = self.combined.get(line_id)
+            if old_record is not None and old_record.line == new_line:
+                continue
+            if old_record is not None:
+                moved.append(self._unmap_combined(line_id))
+            new_record = records[line_id] if records[line_id].line == new_line else LineRecord(new_line)
+            self._map_combined(line_id, new_record)
+            moved.append(new_record)
+
+        #the overlap test of a line changes when it moved or a line it touches moved
+        recheck = set(line_id for line_id in recombine if line_id in self.combined)
+        for record_a in moved:
+            recheck.update(self._combined_starts.get(record_a.midpoint_key, ()))
+            recheck.update(self._combined_ends.get(record_a.midpoint_key, ()))
+            recheck.update(self._combined_mids.get(record_a.start_key, ()))
+            recheck.update(self._combined_mids.get(record_a.end_key, ()))
+        for line_id in recheck:
+            if self._overlapped(line_id):
+                self.deleted.add(line_id)
+            else:
+                self.deleted.discard(line_id)
+
+        return reweighed
+
+    def _map_combined(self, line_id, record):
+        self.combined[line_id] = record
+        self._combined_starts.setdefault(record.start_key, set()).add(line_id)
+        self._combined_ends.setdefault(record.end_key, set()).add(line_id)
+        self._combined_mids.setdefault(record.midpoint_key, set()).add(line_id)
+
+    def _unmap_combined(self, line_id):
+        record = self.combined.pop(line_id)
+        self._combined_starts[record.start_key].discard(line_id)
+        self._combined_ends[record.end_key].discard(line_id)
+        self._combined_mids[record.midpoint_key].discard(line_id)
+        return record
+
+    def _overlapped(self, line_id):
+        #test the combined line against every long line it can overlap
+        record_b = self.combined[line_id]
+        candidates = set(self._combined_mids.get(record_b.start_key, ()))
+        candidates.update(self._combined_mids.get(record_b.end_key, ()))
+        candidates.update(self._combined_starts.get(record_b.midpoint_key, ()))
+        candidates.update(self._combined_ends.get(record_b.midpoint_key, ()))
+        for other_id in candidates:
+            if overlaps(self.combined[other_id], record_b):
+                return True
+        return False
+
+    def line_ids(self):
+        #ids of the lines in list order
+        return sorted(self.records)
+
+    def lines(self):
+        #the bottom-to-top lines in list order
+        return [self.records[line_id].line for line_id in self.line_ids()]
+
+    def weights_dict(self):
+        """
+        The weights in the form add_weight_to_lines returns them.
+
+        Returns:
+        dict: A dictionary mapping each bottom-to-top line to its assigned weight.
+        """
+        return {self.records[line_id].line: self.weights[line_id] for line_id in self.line_ids()}
+
+    def combined_lines(self):
+        """
+        The combined lines without the overlapping ones, in list order.
+
+        Returns:
+        tuple: The lines and weights combine_lines and remove_overlapping_lines return.
+        """
+        new_lines = []
+        new_weights = []
+        for line_id in self.line_ids():
+            if line_id in self.deleted:
+                continue
+            new_lines.append(self.combined[line_id].line)
+            new_weights.append(self.combined_weights[line_id])
+        return new_lines, new_weights
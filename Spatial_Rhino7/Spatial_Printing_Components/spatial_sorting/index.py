@@ -0,0 +1,226 @@
+"""
+Endpoint lookups shared by the weighting, graph and combining stages.
+"""
+
+from bisect import insort
+
+from .geometry import Line
+from .spatial_hash import CHECK_INTERVAL, SpatialHash
+
+
+def point_key(pt):
+    #quantize a point to the 0.01 grid that all the endpoint comparisons use
+    return (round(pt.X, 2), round(pt.Y, 2), round(pt.Z, 2))
+
+def snapped_key(tolerance):
+    """
+    Key function that gives points within tolerance of an earlier point that point's key.
+
+    Two points closer than the tolerance can still round to different
+    point_key keys when a 0.01 boundary falls between them. The returned
+    function looks every point up in a SpatialHash first and reuses the
+    key of the first point it was called with within the tolerance.
+
+    Parameters:
+    tolerance (float): Distance within which two points share a key.
+
+    Returns:
+    function: Maps a point to the point_key of its first match.
+    """
+    grid = SpatialHash(tolerance)
+    keys = []
+
+    def key(pt):
+        first = grid.first_within(pt)
+        if first is None:
+            first = len(keys)
+            keys.append(point_key(pt))
+            grid.add(pt, first)
+        return keys[first]
+
+    return key
+
+
+def bottom_to_top(line):
+    #the line itself when it already runs upwards, otherwise a flipped copy
+    if line.From.Z > line.To.Z:
+        return Line(line.To, line.From)
+    return line
+
+
+#lines whose ends differ less than this in Z count as horizontal for the rules
+FLAT_TOLERANCE = .02
+
+HORIZONTAL = "horizontal"
+VERTICAL = "vertical"
+ANGLED = "angled"
+ORIENTATIONS = (HORIZONTAL, VERTICAL, ANGLED)
+
+
+class LineRecord(object):
+    """
+    Geometry of one input line, computed once and read by every stage.
+
+    The endpoints are stored bottom-to-top, the direction the weight rules
+    read lines in, without flipping the input line.
+
+    The endpoint and midpoint keys come from the key function, point_key
+    unless a snapped_key is given. The orientation is always classified on
+    point_key keys, so it does not depend on the order the lines are read in.
+
+    Parameters:
+    line (Line): The input line.
+    key (function): Maps a point to its endpoint key.
+    """
+
+    __slots__ = ("line", "start", "end", "start_key", "end_key", "orientation", "length",
+                 "midpoint", "midpoint_key", "direction", "direction_key", "average_z",
+                 "flat", "exact_vertical", "round_vertical")
+
+    def __init__(self, line, key=point_key):
+        line = bottom_to_top(line)
+        start_point = line.From
+        end_point = line.To
+        self.line = line
+        self.start = start_point
+        self.end = end_point
+        start_key = point_key(start_point)
+        end_key = point_key(end_point)
+        self.start_key = start_key if key is point_key else key(start_point)
+        self.end_key = end_key if key is point_key else key(end_point)
+
+        self.round_vertical = start_key[0] == end_key[0] and start_key[1] == end_key[1]
+        if start_point.Z == end_point.Z:
+            self.orientation = HORIZONTAL
+        elif self.round_vertical:
+            self.orientation = VERTICAL
+        else:
+            self.orientation = ANGLED
+        #the rules also test for near horizontal lines and exactly vertical lines
+        self.flat = abs(end_point.Z - start_point.Z) <= FLAT_TOLERANCE
+        self.exact_vertical = start_point.X == end_point.X and start_point.Y == end_point.Y
+
+        self.length = line.Length
+        self.midpoint = line.PointAtLength(self.length/2)
+        self.midpoint_key = key(self.midpoint)
+        self.direction = (end_point - start_point).Unitized()
+        self.direction_key = (round(self.direction.X, 2), round(self.direction.Y, 2), round(self.direction.Z, 2))
+        self.average_z = (start_point.Z + end_point.Z) / 2
+
+def line_records(lines, tolerance=None):
+    #records of a list of lines, with endpoints snapped within tolerance when one is given
+    key = point_key if tolerance is None else snapped_key(tolerance)
+    return [LineRecord(line, key) for line in lines]
+
+def line_keys(line, key=point_key):
+    """
+    Start and end key of a line, without the rest of its LineRecord.
+
+    A snapped_key depends on the order it is called in, so the midpoint is
+    looked up as well, right after the endpoints as LineRecord does. Calling
+    this on every line in turn leaves the key function exactly as
+    line_records would, and LineRecord then gives the same keys again.
+
+    Parameters:
+    line (Line): The input line.
+    key (function): Maps a point to its endpoint key.
+
+    Returns:
+    tuple: (start key, end key) of the line read bottom-to-top.
+    """
+    line = bottom_to_top(line)
+    start_key = key(line.From)
+    end_key = key(line.To)
+    if key is not point_key:
+        key(line.PointAtLength(line.Length/2))
+    return start_key, end_key
+
+
+class EndpointIndex(object):
+    """
+    Index of lines keyed on their 0.01-quantized endpoints.
+
+    Lines are stored by position in the input list and read bottom-to-top
+    through their LineRecord. Each node maps to the lines starting and
+    ending at it, grouped by orientation, so a rule only has to look at
+    the lines incident to one node. With a tolerance, endpoints within it
+    of each other share a node even when they round to different keys.
+
+    Parameters:
+    lines (list): List of Line objects.
+    records (list): Optional LineRecord of each line, computed here when omitted.
+    tolerance (float): Optional snapping distance for the records computed here.
+    check (function): Called every CHECK_INTERVAL lines while indexing, raises to stop. Can be None.
+    """
+
+    HORIZONTAL = HORIZONTAL
+    VERTICAL = VERTICAL
+    ANGLED = ANGLED
+    ORIENTATIONS = ORIENTATIONS
+
+    def __init__(self, lines, records=None, tolerance=None, check=None):
+        self.lines = lines
+        self.records = records if records is not None else line_records(lines, tolerance)
+        self.starts = {}
+        self.ends = {}
+
+        for line_id, record in enumerate(self.records):
+            if check is not None and not line_id % CHECK_INTERVAL:
+                check()
+            self._node(self.starts, record.start_key)[record.orientation].append(line_id)
+            self._node(self.ends, record.end_key)[record.orientation].append(line_id)
+
+    def _node(self, table, key):
+        node = table.get(key)
+        if node is None:
+            node = {orientation: [] for orientation in self.ORIENTATIONS}
+            table[key] = node
+        return node
+
+    def _incident(self, table, key, orientations):
+        node = table.get(key)
+        if node is None:
+            return
+        for orientation in orientations:
+            for line_id in node[orientation]:
+                yield line_id
+
+    def add(self, line_id, record):
+        """
+        Add a line to an index whose records are a dictionary keyed by line id.
+
+        Parameters:
+        line_id (int): Id of the line, its position in list order.
+        record (LineRecord): Geometry of the line.
+        """
+        self.records[line_id] = record
+        #keep every id list in list order so the first-match rules stay the same
+        insort(self._node(self.starts, record.start_key)[record.orientation], line_id)
+        insort(self._node(self.ends, record.end_key)[record.orientation], line_id)
+
+    def remove(self, line_id):
+        #drop a line added with add, returning its record
+        record = self.records.pop(line_id)
+        self.starts[record.start_key][record.orientation].remove(line_id)
+        self.ends[record.end_key][record.orientation].remove(line_id)
+        return record
+
+    def starting_at(self, key, orientations=ORIENTATIONS):
+        #ids of the lines whose bottom endpoint is at key
+        return self._incident(self.starts, key, orientations)
+
+    def ending_at(self, key, orientations=ORIENTATIONS):
+        #ids of the lines whose top endpoint is at key
+        return self._incident(self.ends, key, orientations)
+
+
+#points closer than this are treated as the same graph node
+POINT_TOLERANCE = 0.001
+
+def line_orientation(line):
+    #classify a line the same way add_weight_to_lines does
+    if line.From.Z == line.To.Z:
+        return HORIZONTAL
+    elif round(line.From.X, 2) == round(line.To.X, 2) and round(line.From.Y, 2) == round(line.To.Y, 2):
+        return VERTICAL
+    return ANGLED
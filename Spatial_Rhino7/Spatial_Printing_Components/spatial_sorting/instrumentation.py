@@ -0,0 +1,181 @@
+"""
+Stage timers, counters and profiling for finding out where a sort spends its time.
+
+Every instrumented function takes an instrumentation argument that
+defaults to NULL_INSTRUMENTATION, whose methods do nothing. The counters
+that would sit in the inner loops are only collected when the
+instrumentation is enabled, so a normal run pays for one attribute test
+per stage.
+"""
+
+from contextlib import contextmanager
+import cProfile
+import io
+import pstats
+import time
+
+from .index import ORIENTATIONS
+
+
+class _NullStage(object):
+    #reusable context manager that does nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class NullInstrumentation(object):
+    """
+    Instrumentation that records nothing, the default of every instrumented function.
+    """
+
+    enabled = False
+
+    def stage(self, name):
+        return _NULL_STAGE
+
+    def count(self, name, amount=1):
+        pass
+
+    def profile(self, path=None):
+        return _NULL_STAGE
+
+    def report(self):
+        return {}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class Instrumentation(object):
+    """
+    Timings of named stages and named counters of one or more sorts.
+
+    Stages with the same name add up, so a stage run per band or per
+    component reports its total time and how often it ran.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.counters = {}
+        self.profile_stats = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def profile(self, path=None):
+        """
+        Run the block under cProfile, keeping the stats and writing them to path when given.
+
+        Parameters:
+        path (str): Optional file for the pstats dump, readable with pstats.Stats(path).
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield self
+        finally:
+            profiler.disable()
+            self.profile_stats = pstats.Stats(profiler, stream=io.StringIO())
+            if path:
+                self.profile_stats.dump_stats(path)
+
+    def report(self):
+        """
+        The recorded timings and counters.
+
+        Returns:
+        dict: {"stages": {name: {"seconds", "calls"}}, "counters": {name: value}}.
+        """
+        stages = {name: {"seconds": self.seconds[name], "calls": self.calls[name]} for name in self.seconds}
+        return {"stages": stages, "counters": dict(self.counters)}
+
+    def format_report(self, profile_lines=20):
+        #the report as text, with the top of the profile when one was taken
+        lines = []
+        for name, stage in sorted(self.report()["stages"].items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(f"{name:<40} {stage['seconds']:10.4f}s {stage['calls']:8d} calls")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<40} {value:>12}")
+        if self.profile_stats is not None:
+            stream = io.StringIO()
+            self.profile_stats.stream = stream
+            self.profile_stats.sort_stats("cumulative").print_stats(profile_lines)
+            lines.append(stream.getvalue())
+        return "\n".join(lines)
+
+
+class _CountingTable(object):
+    #node table of an EndpointIndex, counting every lookup and the ids read from the nodes found
+    def __init__(self, table, instrumentation):
+        self._table = table
+        self._instrumentation = instrumentation
+
+    def get(self, key):
+        self._instrumentation.count("index_lookups")
+        node = self._table.get(key)
+        if node is None:
+            return None
+        return _CountingNode(node, self._instrumentation)
+
+
+class _CountingNode(object):
+    def __init__(self, node, instrumentation):
+        self._node = node
+        self._instrumentation = instrumentation
+
+    def __getitem__(self, orientation):
+        line_ids = self._node[orientation]
+        self._instrumentation.count("index_hits", len(line_ids))
+        return line_ids
+
+
+class CountingIndex(object):
+    """
+    View of an EndpointIndex that counts its lookups and the line ids they find.
+
+    The rules read the starts and ends node tables, where a lookup is one
+    node and the hits are the ids of the orientations read from it.
+
+    Parameters:
+    index (EndpointIndex): The index to read.
+    instrumentation (Instrumentation): Receives the index_lookups and index_hits counts.
+    """
+
+    def __init__(self, index, instrumentation):
+        self.index = index
+        self.lines = index.lines
+        self.records = index.records
+        self.starts = _CountingTable(index.starts, instrumentation)
+        self.ends = _CountingTable(index.ends, instrumentation)
+        self._instrumentation = instrumentation
+
+    def _counted(self, line_ids):
+        line_ids = list(line_ids)
+        self._instrumentation.count("index_lookups")
+        self._instrumentation.count("index_hits", len(line_ids))
+        return iter(line_ids)
+
+    def starting_at(self, key, orientations=ORIENTATIONS):
+        return self._counted(self.index.starting_at(key, orientations))
+
+    def ending_at(self, key, orientations=ORIENTATIONS):
+        return self._counted(self.index.ending_at(key, orientations))
@@ -0,0 +1,220 @@
+"""
+Flat binary lattice files for headless runs, loaded through numpy.memmap.
+
+A file holds a header, a float64 node table of (X, Y, Z) rows, an int32
+edge table of (start node, end node) rows in line order and optionally a
+float64 weight per edge, all little-endian:
+
+    magic (8 bytes), version (uint32), flags (uint32), node count (uint64), edge count (uint64)
+    nodes   float64[node count, 3]
+    edges   int32[edge count, 2]
+    weights float64[edge count], when flags has HAS_WEIGHTS
+
+NumPy is imported when the functions are called, the rest of the package
+does not depend on it.
+"""
+
+from array import array
+import struct
+
+from .geometry import Line, Point
+from .graph import CSRGraph
+from .index import POINT_TOLERANCE
+from .spatial_hash import SpatialHash
+from .weighting_numpy import round_array, weight_array
+
+LATTICE_MAGIC = b"SSLATTIC"
+LATTICE_VERSION = 1
+HAS_WEIGHTS = 1
+
+_HEADER = struct.Struct("<8sIIQQ")
+
+
+class Lattice(object):
+    """
+    Node and edge tables of a lattice, usually memory-mapped from a file.
+
+    Parameters:
+    nodes (numpy.ndarray): (N, 3) float array of node coordinates.
+    edges (numpy.ndarray): (E, 2) int array of the start and end node of each line.
+    weights (numpy.ndarray): Optional (E,) float array of line weights.
+    """
+
+    def __init__(self, nodes, edges, weights=None):
+        self.nodes = nodes
+        self.edges = edges
+        self.weights = weights
+
+    @property
+    def node_count(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.edges)
+
+    def endpoints(self):
+        #(E, 2, 3) endpoint array in the layout weight_array takes
+        return self.nodes[self.edges]
+
+    def points(self):
+        #the nodes as Point objects, only for code that needs them one by one
+        return [Point(x, y, z) for x, y, z in self.nodes.tolist()]
+
+    def lines(self):
+        #the edges as Line objects, only for code that needs them one by one
+        points = self.points()
+        return [Line(points[start_index], points[end_index]) for start_index, end_index in self.edges.tolist()]
+
+
+def lattice_from_lines(lines, tolerance=POINT_TOLERANCE):
+    """
+    Build the node and edge tables of a list of lines.
+
+    Endpoints within tolerance of an earlier endpoint share its node, which
+    keeps the coordinates of the first endpoint found.
+
+    Parameters:
+    lines (list): List of Line objects.
+    tolerance (float): Distance within which endpoints share a node.
+
+    Returns:
+    Lattice: The lattice, held in memory.
+    """
+    import numpy as np
+
+    grid = SpatialHash(tolerance)
+    coordinates = array("d")
+    edge_ends = array("i")
+    for line in lines:
+        for pt in (line.From, line.To):
+            node_id = grid.first_within(pt)
+            if node_id is None:
+                node_id = grid.count
+                grid.add(pt, node_id)
+                coordinates.extend((pt.X, pt.Y, pt.Z))
+            edge_ends.append(node_id)
+
+    nodes = np.frombuffer(coordinates, dtype=float).reshape(-1, 3)
+    edges = np.frombuffer(edge_ends, dtype=np.intc).reshape(-1, 2)
+    return Lattice(nodes, edges)
+
+def write_lattice(path, nodes, edges, weights=None):
+    """
+    Write node and edge tables to a lattice file.
+
+    Parameters:
+    path (str): File to write.
+    nodes (numpy.ndarray): (N, 3) node coordinates.
+    edges (numpy.ndarray): (E, 2) start and end node of each line.
+    weights (numpy.ndarray): Optional weight of each line.
+    """
+    import numpy as np
+
+    nodes = np.ascontiguousarray(nodes, dtype="<f8").reshape(-1, 3)
+    edges = np.ascontiguousarray(edges, dtype="<i4").reshape(-1, 2)
+    if len(edges) and (edges.min() < 0 or edges.max() >= len(nodes)):
+        raise ValueError("Edge table refers to a node that is not in the node table")
+    flags = 0
+    if weights is not None:
+        weights = np.ascontiguousarray(weights, dtype="<f8")
+        if weights.shape != (len(edges),):
+            raise ValueError("Need exactly one weight per edge")
+        flags |= HAS_WEIGHTS
+
+    with open(path, "wb") as lattice_file:
+        lattice_file.write(_HEADER.pack(LATTICE_MAGIC, LATTICE_VERSION, flags, len(nodes), len(edges)))
+        lattice_file.write(nodes.tobytes())
+        lattice_file.write(edges.tobytes())
+        if weights is not None:
+            lattice_file.write(weights.tobytes())
+
+def load_lattice(path):
+    """
+    Map a lattice file into memory without reading or copying its tables.
+
+    Parameters:
+    path (str): File written by write_lattice.
+
+    Returns:
+    Lattice: The lattice, its arrays are read-only memmaps of the file.
+    """
+    import numpy as np
+
+    with open(path, "rb") as lattice_file:
+        header = lattice_file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError(f"{path} is not a lattice file")
+    magic, version, flags, node_count, edge_count = _HEADER.unpack(header)
+    if magic != LATTICE_MAGIC:
+        raise ValueError(f"{path} is not a lattice file")
+    if version != LATTICE_VERSION:
+        raise ValueError(f"{path} has lattice format version {version}, expected {LATTICE_VERSION}")
+
+    def table(dtype, shape, offset):
+        if not shape[0]:
+            return np.empty(shape, dtype=dtype), offset
+        mapped = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+        return mapped, offset + mapped.nbytes
+
+    nodes, offset = table("<f8", (node_count, 3), _HEADER.size)
+    edges, offset = table("<i4", (edge_count, 2), offset)
+    weights = None
+    if flags & HAS_WEIGHTS:
+        weights, offset = table("<f8", (edge_count,), offset)
+    return Lattice(nodes, edges, weights)
+
+def weight_lattice(lattice):
+    #weights of every edge, the ones add_weight_to_lines gives lattice.lines(), rounding ties included
+    return weight_array(lattice.endpoints())
+
+def lattice_graph(lattice, weights=None):
+    """
+    Build the CSR graph of a lattice straight from its edge table.
+
+    The neighbors of every vertex come out in line order, start entry
+    first, exactly like CSRGraph fills them from a line list.
+
+    Parameters:
+    lattice (Lattice): The lattice.
+    weights (numpy.ndarray): Weight of each line, lattice.weights when omitted. Can be None.
+
+    Returns:
+    CSRGraph: Graph of the lattice with its weight, orientation and length arrays filled.
+    """
+    import numpy as np
+
+    vertex_count = lattice.node_count
+    edge_count = lattice.edge_count
+    edges = np.asarray(lattice.edges, dtype=np.intp)
+
+    #one entry per line end, in line order with the start entry first
+    entry_vertex = edges.reshape(-1)
+    order = np.argsort(entry_vertex, kind="stable")
+    indptr = np.zeros(vertex_count + 1, dtype="l")
+    np.cumsum(np.bincount(entry_vertex, minlength=vertex_count), out=indptr[1:])
+    indices = edges[:, ::-1].reshape(-1)[order]
+    edge_id = (np.arange(2 * edge_count) // 2)[order]
+
+    def to_array(values, typecode):
+        converted = array(typecode)
+        converted.frombytes(np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes())
+        return converted
+
+    graph = CSRGraph.from_arrays(vertex_count, edge_count, to_array(indptr, "l"), to_array(indices, "l"), to_array(edge_id, "l"))
+
+    if weights is None:
+        weights = lattice.weights
+    if weights is not None:
+        graph.weight = to_array(weights, "d")
+
+    #same orientation test as line_orientation, rounded like round() so ties agree too
+    start = np.asarray(lattice.nodes)[edges[:, 0]]
+    end = np.asarray(lattice.nodes)[edges[:, 1]]
+    start_key = round_array(start[:, :2], 2)
+    end_key = round_array(end[:, :2], 2)
+    vertical = np.all(start_key == end_key, axis=1)
+    orientation = np.where(start[:, 2] == end[:, 2], 0, np.where(vertical, 1, 2))
+    graph.orientation = to_array(orientation, "b")
+    graph.length = to_array(np.sqrt(((end - start) ** 2).sum(axis=1)), "d")
+    return graph
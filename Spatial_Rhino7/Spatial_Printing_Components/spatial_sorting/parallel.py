@@ -0,0 +1,138 @@
+"""
+Multiprocess weighting of large lattices split into Z bands.
+
+Every weight rule only looks at lines sharing an endpoint with the line
+being scored, or for verticals_with_angled_at_start at lines starting
+where such a neighbor starts. A band is therefore scored together with the
+lines reaching into its Z range and those reaching down to the bottom of
+them, kept in input order, which gives it exactly the weights the serial
+add_weight_to_lines gives it. The bands and halos are found from the raw
+endpoint Z coordinates, so the only index is the one each worker builds
+for its own band.
+"""
+
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from .geometry import coordinates_line, line_coordinates
+from .index import EndpointIndex
+from .weighting import add_weight_to_lines, collect_weights, line_weight
+
+#how far apart two endpoints sharing a 0.01 key can be in Z
+KEY_PAD = .01
+
+
+def z_bands(coordinates, band_count):
+    """
+    Split lines into bands of about equal size by the average Z of their endpoints.
+
+    Parameters:
+    coordinates (list): line_coordinates tuple of every line.
+    band_count (int): Number of bands.
+
+    Returns:
+    list: One list of line ids per non-empty band, each in input order.
+    """
+    line_count = len(coordinates)
+    by_height = sorted(range(line_count), key=lambda line_id: coordinates[line_id][2] + coordinates[line_id][5])
+    band_size = max(1, -(-line_count // band_count))
+    bands = []
+    for first in range(0, line_count, band_size):
+        bands.append(sorted(by_height[first:first + band_size]))
+    return bands
+
+
+class ZSpans(object):
+    """
+    Lines sorted by the Z of their lower end, to find every line reaching into a Z range.
+
+    Parameters:
+    coordinates (list): line_coordinates tuple of every line.
+    """
+
+    def __init__(self, coordinates):
+        self.bottoms = [min(c[2], c[5]) for c in coordinates]
+        self.tops = [max(c[2], c[5]) for c in coordinates]
+        self.by_bottom = sorted(range(len(coordinates)), key=self.bottoms.__getitem__)
+        self.sorted_bottoms = [self.bottoms[line_id] for line_id in self.by_bottom]
+        self.max_height = max(top - bottom for bottom, top in zip(self.bottoms, self.tops)) if coordinates else 0
+
+    def reaching(self, low, high):
+        #ids of the lines with a point between low and high, unordered
+        tops = self.tops
+        first = bisect_left(self.sorted_bottoms, low - self.max_height)
+        last = bisect_right(self.sorted_bottoms, high)
+        return [line_id for line_id in self.by_bottom[first:last] if tops[line_id] >= low]
+
+def band_halo(spans, band, pad=KEY_PAD):
+    """
+    Ids of all lines the weight rules can read when scoring a band, band included.
+
+    These are the lines reaching into the Z range of the band, which holds
+    every line sharing an endpoint with it, and the lines reaching down to
+    the lowest end of those, where the verticals ending on the band start.
+
+    Parameters:
+    spans (ZSpans): Z spans of all the lines.
+    band (list): Line ids of the band.
+    pad (float): How far apart in Z two endpoints sharing a key can be.
+
+    Returns:
+    list: Line ids in input order.
+    """
+    low = min(spans.bottoms[line_id] for line_id in band) - pad
+    high = max(spans.tops[line_id] for line_id in band) + pad
+    ring = spans.reaching(low, high)
+    low = min(spans.bottoms[line_id] for line_id in ring) - pad
+    return sorted(spans.reaching(low, high))
+
+def _weight_band(task):
+    #worker: index the band and its halo, then score only the band lines
+    band, halo, coordinates, tolerance = task
+    lines = [coordinates_line(c) for c in coordinates]
+    index = EndpointIndex(lines, tolerance=tolerance)
+    position = {line_id: i for i, line_id in enumerate(halo)}
+    return [line_weight(position[line_id], index) for line_id in band]
+
+def add_weight_to_lines_parallel(lines, graph=None, workers=None, band_count=None, tolerance=None):
+    """
+    Assign the add_weight_to_lines weights on a process pool, one Z band per task.
+
+    With a tolerance the endpoints are snapped within each band, which only
+    differs from snapping the whole list when a run of endpoints, each within
+    tolerance of the next, is wider than the tolerance itself.
+
+    Parameters:
+    lines (list): List of Line objects.
+    graph (CSRGraph): Graph of the lines, its weight array is filled by edge id. Can be None.
+    workers (int): Number of processes, defaults to the number of cores. 1 weighs the lines in this process.
+    band_count (int): Number of Z bands, defaults to one per worker.
+    tolerance (float): Optional snapping distance of the endpoint index, as in EndpointIndex.
+
+    Returns:
+    dict: A dictionary mapping each line to its assigned weight, identical to add_weight_to_lines.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return add_weight_to_lines(lines, graph, tolerance=tolerance)
+
+    band_count = band_count or workers
+    coordinates = [line_coordinates(line) for line in lines]
+    spans = ZSpans(coordinates)
+    pad = KEY_PAD if tolerance is None else KEY_PAD + 2 * tolerance
+    tasks = []
+    for band in z_bands(coordinates, band_count):
+        halo = band_halo(spans, band, pad)
+        tasks.append((band, halo, [coordinates[line_id] for line_id in halo], tolerance))
+
+    weight_values = [None] * len(lines)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for (band, halo, band_coordinates, band_tolerance), band_weights in zip(tasks, executor.map(_weight_band, tasks)):
+            for line_id, weight in zip(band, band_weights):
+                weight_values[line_id] = weight
+
+    return collect_weights(lines, weight_values, graph)
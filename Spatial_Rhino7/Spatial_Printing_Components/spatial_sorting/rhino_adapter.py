@@ -0,0 +1,35 @@
+"""
+Conversion between RhinoCommon geometry and the spatial_sorting core types.
+
+Rhino is only imported when converting back to RhinoCommon, so this module
+can be imported off-Rhino. Anything with X/Y/Z or From/To members converts
+to the core types, including the core types themselves.
+"""
+
+from .geometry import Line, Point
+
+
+def to_core_point(point):
+    return Point(point.X, point.Y, point.Z)
+
+def to_core_points(points):
+    return [to_core_point(point) for point in points]
+
+def to_core_line(line):
+    return Line(line.From, line.To)
+
+def to_core_lines(lines):
+    return [to_core_line(line) for line in lines]
+
+def to_rhino_point(point):
+    import Rhino
+
+    return Rhino.Geometry.Point3d(point.X, point.Y, point.Z)
+
+def to_rhino_line(line):
+    import Rhino
+
+    return Rhino.Geometry.Line(to_rhino_point(line.From), to_rhino_point(line.To))
+
+def to_rhino_lines(lines):
+    return [to_rhino_line(line) for line in lines]
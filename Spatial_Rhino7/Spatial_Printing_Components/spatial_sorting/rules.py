@@ -0,0 +1,248 @@
+"""
+Weight rules as a declarative table, the one definition of the rules.
+
+Every WeightRule reads the lines starting at the start or ending at the
+end of the line being scored. A RuleSet compiles each row into a small
+function that walks that incidence list and stops at the first line
+that decides the rule, so a new rule costs O(degree) per line instead of
+another pass over the lattice. weighting.line_weight and every stage
+built on it weigh with DEFAULT_RULE_SET, so tuning a rule means editing
+its row here. Other rule sets can be passed to add_weight_to_lines or
+tried side by side on the same lattice with compare_rule_sets.
+"""
+
+import time
+
+from .index import ANGLED, HORIZONTAL, ORIENTATIONS, VERTICAL, EndpointIndex
+
+#weight offsets of the rules, and the offset taken off the average Z of every line
+VERTICAL_AT_START_WEIGHT = 0.1
+VERTICAL_AT_END_WEIGHT = 0.05
+ANGLED_AT_START_WEIGHT = -0.15
+ANGLED_AT_END_WEIGHT = 0.21
+NO_ANGLE_AT_TOP_WEIGHT = .07
+Z_OFFSET = 32.481
+
+#the line end a rule reads, the lines starting at its start or the lines ending at its end
+START = "start"
+END = "end"
+
+#ANY adds the delta when a neighbor matches, NONE when none does, FIRST adds
+#the value of another rule on the matching neighbor with the lowest id
+ANY = "any"
+NONE = "none"
+FIRST = "first"
+
+
+def calculate_weight(average_z):
+    """
+
+    Parameters:
+    average_z (float): Average Z height.
+
+    Returns:
+    float: Assigned weight.
+    """
+
+    weight = average_z # Adjust the multiplier as needed
+    return weight
+
+
+class WeightRule(object):
+    """
+    One row of a rule table.
+
+    Parameters:
+    name (str): Name of the rule, used for the rule counts.
+    orientation (str): Orientation of the lines the rule scores.
+    endpoint (str): START or END, the line end whose incident lines are read.
+    neighbors (tuple): Orientations of the incident lines read.
+    predicate (function): predicate(record, other) for the LineRecord of the line and of an incident line.
+    delta (float): Weight added when the rule holds, unused in FIRST mode.
+    mode (str): ANY, NONE or FIRST.
+    guard (function): Optional guard(record) the line itself has to pass for the rule to apply.
+    then (str): In FIRST mode, the name of the rule whose value on the first match is added.
+    """
+
+    def __init__(self, name, orientation, endpoint, neighbors, predicate, delta=0, mode=ANY, guard=None, then=None):
+        if endpoint not in (START, END):
+            raise ValueError(f"Unknown endpoint {endpoint}")
+        if mode not in (ANY, NONE, FIRST):
+            raise ValueError(f"Unknown mode {mode}")
+        if mode == FIRST and then is None:
+            raise ValueError(f"Rule {name} needs the name of the rule to apply to its first match")
+        self.name = name
+        self.orientation = orientation
+        self.endpoint = endpoint
+        self.neighbors = tuple(neighbors)
+        self.predicate = predicate
+        self.delta = delta
+        self.mode = mode
+        self.guard = guard
+        self.then = then
+
+
+class RuleSet(object):
+    """
+    A rule table and the Z offset of its weights.
+
+    A line weighs the sum of the values of the rules for its orientation,
+    added in table order, plus calculate_weight of its average Z minus
+    z_offset, rounded to 3 decimals.
+
+    Parameters:
+    rules (list): WeightRule rows.
+    z_offset (float): Offset taken off the average Z of every line.
+    name (str): Name of the rule set, used by compare_rule_sets.
+    """
+
+    def __init__(self, rules, z_offset=Z_OFFSET, name="rules"):
+        self.rules = tuple(rules)
+        self.z_offset = z_offset
+        self.name = name
+        self.by_name = {rule.name: rule for rule in self.rules}
+        for rule in self.rules:
+            if rule.then is not None and rule.then not in self.by_name:
+                raise ValueError(f"Rule {rule.name} refers to the unknown rule {rule.then}")
+        #FIRST rules look the value of their then rule up when they run, so the order does not matter
+        self._values = {}
+        for rule in self.rules:
+            self._values[rule.name] = self._compile(rule)
+        #the names and compiled values of the rules of every orientation, in table order
+        self._names = {orientation: tuple(rule.name for rule in self.rules if rule.orientation == orientation)
+                       for orientation in ORIENTATIONS}
+        self._scoring = {orientation: tuple(self._values[name] for name in names) for orientation, names in self._names.items()}
+
+    def _compile(self, rule):
+        #value(record, index) of one rule, reading the node tables of the index straight
+        #and stopping at the first incident line that decides it
+        predicate = rule.predicate
+        guard = rule.guard
+        delta = rule.delta
+        neighbors = rule.neighbors
+        at_start = rule.endpoint == START
+        values = self._values
+        then = rule.then
+
+        if rule.mode == FIRST:
+            def value(record, index):
+                if guard is not None and not guard(record):
+                    return 0
+                node = index.starts.get(record.start_key) if at_start else index.ends.get(record.end_key)
+                if node is None:
+                    return 0
+                records = index.records
+                #ids come in ascending order per orientation, so the first match of each is its lowest
+                first_id = None
+                for orientation in neighbors:
+                    for other_id in node[orientation]:
+                        if predicate(record, records[other_id]):
+                            if first_id is None or other_id < first_id:
+                                first_id = other_id
+                            break
+                if first_id is None:
+                    return 0
+                return values[then](records[first_id], index)
+            return value
+
+        found = delta if rule.mode == ANY else 0
+        missing = 0 if rule.mode == ANY else delta
+
+        def value(record, index):
+            if guard is not None and not guard(record):
+                return 0
+            node = index.starts.get(record.start_key) if at_start else index.ends.get(record.end_key)
+            if node is None:
+                return missing
+            records = index.records
+            for orientation in neighbors:
+                for other_id in node[orientation]:
+                    if predicate(record, records[other_id]):
+                        return found
+            return missing
+        return value
+
+    def rule_value(self, name, line_id, index):
+        #value of a single rule on a line, whatever the orientation of the line
+        return self._values[name](index.records[line_id], index)
+
+    def line_weight(self, line_id, index, rule_counts=None):
+        """
+        Weight of one line of an EndpointIndex.
+
+        Parameters:
+        line_id (int): Position of the line in the indexed list.
+        index (EndpointIndex): Index of the lines.
+        rule_counts (dict): Optional count of the non-zero results of every rule, by rule name.
+
+        Returns:
+        float: The weight, rounded to 3 decimals.
+        """
+        record = index.records[line_id]
+        weight = 0
+        if rule_counts is None:
+            for value in self._scoring[record.orientation]:
+                weight = weight + value(record, index)
+        else:
+            for name, value in zip(self._names[record.orientation], self._scoring[record.orientation]):
+                result = value(record, index)
+                weight = weight + result
+                if result:
+                    rule_counts[name] = rule_counts.get(name, 0) + 1
+
+        weight = weight + calculate_weight(record.average_z) - self.z_offset
+        return round(weight, 3)
+
+
+DEFAULT_RULES = (
+    WeightRule("find_intersection_vertical_at_end", VERTICAL, END, ORIENTATIONS,
+               lambda line, other: not other.exact_vertical,
+               VERTICAL_AT_END_WEIGHT, guard=lambda line: not line.flat),
+    WeightRule("find_intersection_vertical_at_start", VERTICAL, START, (VERTICAL, ANGLED),
+               lambda line, other: not other.flat and not other.exact_vertical,
+               VERTICAL_AT_START_WEIGHT),
+    WeightRule("vertical_no_angle_at_top", VERTICAL, END, (VERTICAL, ANGLED),
+               lambda line, other: not other.flat and not other.exact_vertical and other.average_z <= line.average_z,
+               NO_ANGLE_AT_TOP_WEIGHT, mode=NONE),
+    WeightRule("find_intersection_angled_at_start", ANGLED, START, (VERTICAL, HORIZONTAL),
+               lambda line, other: other.round_vertical,
+               ANGLED_AT_START_WEIGHT, guard=lambda line: not line.flat),
+    WeightRule("find_intersection_angled_at_end", ANGLED, END, (VERTICAL,),
+               lambda line, other: not other.flat and other.exact_vertical,
+               ANGLED_AT_END_WEIGHT),
+    #the vertical ending at the top of the line passes on its own vertical at start weight
+    WeightRule("verticals_with_angled_at_start", ANGLED, END, (VERTICAL, HORIZONTAL),
+               lambda line, other: other.round_vertical and other.start_key != line.start_key,
+               mode=FIRST, then="find_intersection_vertical_at_start"),
+)
+
+DEFAULT_RULE_SET = RuleSet(DEFAULT_RULES, name="default")
+
+
+def compare_rule_sets(lines, rule_sets, index=None):
+    """
+    Weight the same lines with several rule sets, for A/B runs.
+
+    Parameters:
+    lines (list): List of Line objects.
+    rule_sets (list): RuleSet objects, names should differ.
+    index (EndpointIndex): Optional prebuilt index of lines, built here when omitted.
+
+    Returns:
+    dict: Per rule set name, {"seconds", "weights", "rule_counts", "changed"}, where
+    changed counts the lines whose weight differs from the first rule set.
+    """
+    if index is None:
+        index = EndpointIndex(lines)
+    results = {}
+    first_weights = None
+    for rule_set in rule_sets:
+        rule_counts = {}
+        start = time.perf_counter()
+        weights = [rule_set.line_weight(line_id, index, rule_counts) for line_id in range(len(lines))]
+        seconds = time.perf_counter() - start
+        if first_weights is None:
+            first_weights = weights
+        changed = sum(1 for weight, first_weight in zip(weights, first_weights) if weight != first_weight)
+        results[rule_set.name] = {"seconds": seconds, "weights": weights, "rule_counts": rule_counts, "changed": changed}
+    return results
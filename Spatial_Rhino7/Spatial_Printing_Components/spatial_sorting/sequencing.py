@@ -0,0 +1,187 @@
+"""
+Travel-minimizing sequencing of print segments.
+
+A segment is a run of lines printed without lifting, its lines keep their
+print direction. Within a Z band the segments are chained greedily to the
+segment starting nearest the end of the last one, found through a
+SpatialHash, and a windowed 2-opt pass can then shorten the travel further
+until its time budget is spent.
+"""
+
+import math
+import time
+
+from .index import POINT_TOLERANCE
+from .spatial_hash import SpatialHash
+
+#how far ahead 2-opt looks for the end of a reversed run of segments
+TWO_OPT_WINDOW = 50
+
+
+def split_segments(ordered_lines, tolerance=POINT_TOLERANCE):
+    """
+    Cut lines in print order into segments wherever a line does not start at the end of the one before.
+
+    Parameters:
+    ordered_lines (list): List of Line objects in print order.
+    tolerance (float): Distance within which a line end and the next start are the same point.
+
+    Returns:
+    list: One list of lines per segment, in print order.
+    """
+    segments = []
+    for line in ordered_lines:
+        if segments and segments[-1][-1].To.DistanceTo(line.From) <= tolerance:
+            segments[-1].append(line)
+        else:
+            segments.append([line])
+    return segments
+
+def travel_distance(segments):
+    #total length of the moves from the end of each segment to the start of the next
+    return sum(segments[i][-1].To.DistanceTo(segments[i + 1][0].From) for i in range(len(segments) - 1))
+
+def _cell_size(points):
+    #grid size that puts about one point in a cell, over the axes the points spread along
+    spans = []
+    for axis in ("X", "Y", "Z"):
+        values = [getattr(pt, axis) for pt in points]
+        span = max(values) - min(values)
+        if span > 0:
+            spans.append(span)
+    if not spans:
+        return 1.0
+    return (math.prod(spans) / len(points)) ** (1.0 / len(spans))
+
+def nearest_neighbor_order(segments, position=None):
+    """
+    Chain the segments, always moving to the unprinted segment starting nearest the current position.
+
+    Parameters:
+    segments (list): Segments as lists of Line objects.
+    position (Point): Where the nozzle is before the first segment, the first segment is printed first when None.
+
+    Returns:
+    list: The same segments in the new order.
+    """
+    if not segments:
+        return []
+    starts = [segment[0].From for segment in segments]
+    cell_size = _cell_size(starts)
+    grid = SpatialHash(cell_size / 8, cell_size)
+    for segment_id, pt in enumerate(starts):
+        grid.add(pt, segment_id)
+    remaining = dict.fromkeys(range(len(segments)))
+
+    def take(segment_id):
+        grid.remove(starts[segment_id], segment_id)
+        del remaining[segment_id]
+        return segments[segment_id]
+
+    ordered = []
+    if position is None:
+        ordered.append(take(0))
+        position = segments[0][-1].To
+    while remaining:
+        radius = cell_size
+        while True:
+            #search a growing ball until it holds a start, or scan what is left once the ball gets too big
+            if (2 * radius / cell_size + 1) ** 3 > len(remaining):
+                candidates = remaining
+            else:
+                candidates = grid.within(position, radius)
+            if candidates:
+                break
+            radius *= 2
+        segment_id = min(candidates, key=lambda i: (position.DistanceTo(starts[i]), i))
+        ordered.append(take(segment_id))
+        position = ordered[-1][-1].To
+    return ordered
+
+def _prefix_links(order):
+    #running sums of the forward moves i -> i + 1 and the backward moves i + 1 -> i
+    forward = [0.0]
+    backward = [0.0]
+    for i in range(len(order) - 1):
+        forward.append(forward[-1] + order[i][-1].To.DistanceTo(order[i + 1][0].From))
+        backward.append(backward[-1] + order[i + 1][-1].To.DistanceTo(order[i][0].From))
+    return forward, backward
+
+def two_opt(segments, deadline=None, window=TWO_OPT_WINDOW):
+    """
+    Shorten the travel by reversing runs of segments, keeping the first segment and every print direction.
+
+    Each candidate reversal is priced in O(1) from running sums of the
+    moves in both directions, and runs are at most window segments long.
+
+    Parameters:
+    segments (list): Segments as lists of Line objects, in their current order.
+    deadline (float): time.monotonic() value at which to stop with the best order so far. Can be None.
+    window (int): Longest run of segments to reverse.
+
+    Returns:
+    list: The segments in the improved order.
+    """
+    order = list(segments)
+    count = len(order)
+
+    def move(a, b):
+        return order[a][-1].To.DistanceTo(order[b][0].From)
+
+    improved = True
+    while improved:
+        improved = False
+        forward, backward = _prefix_links(order)
+        for i in range(count - 2):
+            if deadline is not None and time.monotonic() >= deadline:
+                return order
+            for j in range(i + 2, min(count, i + 1 + window)):
+                #reverse order[i + 1:j + 1], the segments themselves keep their direction
+                old = forward[j + 1 if j + 1 < count else j] - forward[i]
+                new = move(i, j) + backward[j] - backward[i + 1]
+                if j + 1 < count:
+                    new += move(i + 1, j + 1)
+                if new < old - 1e-9:
+                    order[i + 1:j + 1] = order[i + 1:j + 1][::-1]
+                    forward, backward = _prefix_links(order)
+                    improved = True
+    return order
+
+def sequence_segments(segments, band_height=None, time_budget=None, window=TWO_OPT_WINDOW):
+    """
+    Reorder segments to cut the travel between them, one Z band at a time from the bottom up.
+
+    Parameters:
+    segments (list): Segments as lists of Line objects, weight sorted.
+    band_height (float): Height of the Z bands, by the lowest point of each segment. All segments form one band when None.
+    time_budget (float): Seconds for the 2-opt passes of all bands, no 2-opt when None.
+    window (int): Longest run of segments 2-opt reverses.
+
+    Returns:
+    tuple: The reordered segments, the travel distance before and the travel distance after.
+    """
+    if not segments:
+        return [], 0.0, 0.0
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+
+    if band_height is None:
+        bands = [list(segments)]
+    else:
+        if band_height <= 0:
+            raise ValueError("band_height has to be positive")
+        bottoms = [min(min(line.From.Z, line.To.Z) for line in segment) for segment in segments]
+        lowest = min(bottoms)
+        grouped = {}
+        for segment, bottom in zip(segments, bottoms):
+            grouped.setdefault(int(math.floor((bottom - lowest) / band_height)), []).append(segment)
+        bands = [grouped[band_number] for band_number in sorted(grouped)]
+
+    ordered = []
+    for band in bands:
+        position = ordered[-1][-1].To if ordered else None
+        band_order = nearest_neighbor_order(band, position)
+        if deadline is not None:
+            #the move into the band stays fixed, 2-opt starts after the first segment
+            band_order = two_opt(band_order, deadline, window)
+        ordered.extend(band_order)
+    return ordered, travel_distance(segments), travel_distance(ordered)
@@ -0,0 +1,138 @@
+"""
+Solve-to-solve cache of the endpoint index, graph and weights, kept in a dict-like store.
+
+Inside Grasshopper the store is scriptcontext.sticky, which outlives a
+solve, so a recompute triggered by a downstream slider finds the state of
+its unchanged crvs and nodes and skips indexing, graph building and
+weighting. Entries are keyed by geometry_key, and the least recently used
+ones are dropped once the cache holds more than max_entries lattices or
+max_lines lines, so a session going through many lattices does not keep
+them all.
+
+With a ResultCache behind it, a miss in the store reads the weights from
+disk instead and only builds the graph again, and a lattice computed
+from scratch is written there for the next session.
+"""
+
+from collections import OrderedDict
+
+from .cache import RULE_PARAMETERS, compute_result, geometry_key
+from .graph import build_graph
+from .index import POINT_TOLERANCE, EndpointIndex
+from .instrumentation import NULL_INSTRUMENTATION
+from .weighting import add_weight_to_lines, collect_weights
+
+#key of the cache in the store, shared by every component using the package
+STICKY_KEY = "spatial_sorting.solve_cache"
+
+
+class SolveState(object):
+    """
+    Everything computed from one set of lines and points before ordering.
+
+    Parameters:
+    lines (list): The Line objects the state was computed from.
+    points (list): The Point objects the graph was built from.
+    index (EndpointIndex): Index of the lines, holding the LineRecord of every line.
+    None when the weights were read from a ResultCache.
+    graph (CSRGraph): Graph of the lines with their weights.
+    missing_lines (list): Indices of the lines left out of the graph.
+    weights (dict): A dictionary mapping each bottom-to-top line to its assigned weight.
+    """
+
+    __slots__ = ("lines", "points", "index", "graph", "missing_lines", "weights")
+
+    def __init__(self, lines, points, index, graph, missing_lines, weights):
+        self.lines = lines
+        self.points = points
+        self.index = index
+        self.graph = graph
+        self.missing_lines = missing_lines
+        self.weights = weights
+
+
+class SolveCache(object):
+    """
+    Least recently used SolveState entries, kept in a store that outlives the solve.
+
+    Parameters:
+    store (dict): Dict-like store, scriptcontext.sticky inside Grasshopper.
+    max_entries (int): Most lattices kept.
+    max_lines (int): Most lines kept over all lattices, the newest entry is kept whatever its size.
+    key (str): Key of the cache in the store.
+    result_cache (ResultCache): Optional on-disk cache read on a miss in the store and filled on a full solve.
+    """
+
+    def __init__(self, store, max_entries=4, max_lines=2000000, key=STICKY_KEY, result_cache=None):
+        entries = store[key] if key in store else None
+        if not isinstance(entries, OrderedDict):
+            entries = OrderedDict()
+            store[key] = entries
+        self.entries = entries
+        self.max_entries = max_entries
+        self.max_lines = max_lines
+        self.result_cache = result_cache
+
+    def get(self, fingerprint):
+        #the state for a fingerprint, marked as most recently used, None on a miss
+        state = self.entries.get(fingerprint)
+        if state is not None:
+            self.entries.move_to_end(fingerprint)
+        return state
+
+    def put(self, fingerprint, state):
+        self.entries[fingerprint] = state
+        self.entries.move_to_end(fingerprint)
+        self.evict()
+
+    def evict(self):
+        #drop the least recently used entries until both limits hold
+        line_total = sum(len(state.lines) for state in self.entries.values())
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or line_total > self.max_lines):
+            fingerprint, state = self.entries.popitem(last=False)
+            line_total -= len(state.lines)
+
+    def clear(self):
+        self.entries.clear()
+
+    def solve(self, lines, points, tolerance=POINT_TOLERANCE, instrumentation=NULL_INSTRUMENTATION):
+        """
+        Index, graph and weights of the lines, from the cache when the geometry is unchanged.
+
+        Parameters:
+        lines (list): List of Line objects.
+        points (list): List of Point objects.
+        tolerance (float): Distance within which a line end snaps to a point, and endpoints share a node of the rules.
+        instrumentation (Instrumentation): Receives the stage times and the solve and result cache hit and miss counts.
+
+        Returns:
+        tuple: The SolveState, and whether it came from the cache.
+        """
+        with instrumentation.stage("fingerprint"):
+            fingerprint = geometry_key(lines, points, RULE_PARAMETERS + (tolerance,))
+        state = self.get(fingerprint)
+        if state is not None:
+            instrumentation.count("solve_cache_hits")
+            return state, True
+
+        instrumentation.count("solve_cache_misses")
+        result = None
+        if self.result_cache is not None:
+            with instrumentation.stage("result_cache"):
+                result = self.result_cache.get(fingerprint)
+            instrumentation.count("result_cache_misses" if result is None else "result_cache_hits")
+
+        graph, missing_lines = build_graph(lines, points, tolerance, instrumentation)
+        if result is not None:
+            index = None
+            weights = collect_weights(lines, result.weights, graph)
+        else:
+            with instrumentation.stage("index"):
+                index = EndpointIndex(lines, tolerance=tolerance)
+            weights = add_weight_to_lines(lines, graph, index, instrumentation)
+            if self.result_cache is not None:
+                with instrumentation.stage("result_cache"):
+                    self.result_cache.put(fingerprint, compute_result(lines, points, index, graph))
+        state = SolveState(lines, points, index, graph, missing_lines, weights)
+        self.put(fingerprint, state)
+        return state, False
@@ -0,0 +1,153 @@
+"""
+Uniform grid hash for finding points and line endpoints within a tolerance.
+
+Rounding coordinates to a key, like point_key does, splits two points
+that are closer than the tolerance whenever a bucket boundary falls
+between them. The grid here stores every point in each cell its
+tolerance cube overlaps, one cell for almost every point, so a query at
+the tolerance reads the single cell holding the query point and then
+tests the real distance.
+"""
+
+from math import floor
+
+#points or lines a long loop handles between two calls of its check function
+CHECK_INTERVAL = 1000
+
+
+class SpatialHash(object):
+    """
+    Points with an item each, hashed on a uniform grid.
+
+    Parameters:
+    tolerance (float): Default query radius.
+    cell_size (float): Grid size, eight times the tolerance when omitted.
+    """
+
+    def __init__(self, tolerance, cell_size=None):
+        if tolerance <= 0:
+            raise ValueError("tolerance has to be positive")
+        self.tolerance = tolerance
+        self.cell_size = cell_size or 8 * tolerance
+        self.cells = {}
+        self.count = 0
+
+    def _cell(self, x, y, z):
+        #cells are centred on multiples of the cell size, where modelled nodes tend to sit
+        size = self.cell_size
+        return (floor(x / size + .5), floor(y / size + .5), floor(z / size + .5))
+
+    def _cells_around(self, x, y, z, radius):
+        #every cell the cube of the radius around a point overlaps
+        low = self._cell(x - radius, y - radius, z - radius)
+        high = self._cell(x + radius, y + radius, z + radius)
+        if low == high:
+            return (low,)
+        return [(i, j, k)
+                for i in range(low[0], high[0] + 1)
+                for j in range(low[1], high[1] + 1)
+                for k in range(low[2], high[2] + 1)]
+
+    def add(self, pt, item):
+        #store a point, items come back from the queries in the order they were added
+        entry = (pt.X, pt.Y, pt.Z, item)
+        for cell in self._cells_around(pt.X, pt.Y, pt.Z, self.tolerance):
+            self.cells.setdefault(cell, []).append(entry)
+        self.count += 1
+
+    def remove(self, pt, item):
+        #drop a point stored with add, found by its coordinates and item
+        for cell in self._cells_around(pt.X, pt.Y, pt.Z, self.tolerance):
+            entries = self.cells[cell]
+            for i, entry in enumerate(entries):
+                if entry[3] == item:
+                    del entries[i]
+                    break
+        self.count -= 1
+
+    def _entries_near(self, x, y, z, radius):
+        #entries that can lie within radius, each once
+        if radius <= self.tolerance:
+            return self.cells.get(self._cell(x, y, z), ())
+        entries = []
+        seen = set()
+        for cell in self._cells_around(x, y, z, radius - self.tolerance):
+            for entry in self.cells.get(cell, ()):
+                if id(entry) not in seen:
+                    seen.add(id(entry))
+                    entries.append(entry)
+        return entries
+
+    def within(self, pt, radius=None):
+        """
+        Items of all points within radius of pt.
+
+        Parameters:
+        pt (Point): Query point.
+        radius (float): Query radius, the tolerance when omitted.
+
+        Returns:
+        list: The items, in the order they were added for queries at the tolerance.
+        """
+        if radius is None:
+            radius = self.tolerance
+        x, y, z = pt.X, pt.Y, pt.Z
+        limit = radius * radius
+        return [item for px, py, pz, item in self._entries_near(x, y, z, radius)
+                if (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2 <= limit]
+
+    def first_within(self, pt, radius=None):
+        #the smallest item within radius of pt, None when there is none
+        if radius is None:
+            radius = self.tolerance
+        x, y, z = pt.X, pt.Y, pt.Z
+        limit = radius * radius
+        first = None
+        for px, py, pz, item in self._entries_near(x, y, z, radius):
+            if (px - x) ** 2 + (py - y) ** 2 + (pz - z) ** 2 <= limit and (first is None or item < first):
+                first = item
+        return first
+
+
+def point_hash(points, tolerance, check=None):
+    """
+    Hash a list of points with their list index as item.
+
+    Parameters:
+    points (list): List of Point objects.
+    tolerance (float): Distance within which two points are the same node.
+    check (function): Called every CHECK_INTERVAL points, raises to stop the hashing. Can be None.
+
+    Returns:
+    SpatialHash: The hash, first_within gives the first point matching a query.
+    """
+    grid = SpatialHash(tolerance)
+    for i, pt in enumerate(points):
+        if check is not None and not i % CHECK_INTERVAL:
+            check()
+        grid.add(pt, i)
+    return grid
+
+def endpoint_hash(lines, tolerance, check=None):
+    #hash both endpoints of every line with the line id as item
+    grid = SpatialHash(tolerance)
+    for line_id, line in enumerate(lines):
+        if check is not None and not line_id % CHECK_INTERVAL:
+            check()
+        grid.add(line.From, line_id)
+        grid.add(line.To, line_id)
+    return grid
+
+def lines_at(grid, pt, radius=None):
+    """
+    Ids of the lines with an endpoint within radius of a point.
+
+    Parameters:
+    grid (SpatialHash): Hash from endpoint_hash.
+    pt (Point): Query point.
+    radius (float): Query radius, the tolerance of the hash when omitted.
+
+    Returns:
+    list: Sorted line ids, each once.
+    """
+    return sorted(set(grid.within(pt, radius)))
@@ -0,0 +1,125 @@
+"""
+Band by band weighting and ordering, streamed from the bottom of the lattice up.
+
+calculate_weight makes the average Z the dominant term of every weight, so
+the print order is layer by layer anyway. Each Z band is weighted with an
+EndpointIndex of only the band and the lines the rules read around it,
+ordered on its own graph and handed out before the next band is touched.
+Only a map of line ids per node and the snapped endpoint keys are kept
+for the whole lattice, and the LineRecord of every line around a band is kept for the next band, whose
+halo shares the lines in between.
+"""
+
+import math
+
+from .graph import build_graph
+from .index import POINT_TOLERANCE, EndpointIndex, LineRecord, line_keys, snapped_key
+from .instrumentation import NULL_INSTRUMENTATION
+from .spatial_hash import SpatialHash
+from .traversal import order_lines
+from .weighting import line_weight
+
+
+def band_points(lines, tolerance=POINT_TOLERANCE):
+    #one point per group of endpoints within tolerance of each other, in the order found
+    points = []
+    grid = SpatialHash(tolerance)
+    for line in lines:
+        for pt in (line.From, line.To):
+            if grid.first_within(pt) is None:
+                grid.add(pt, len(points))
+                points.append(pt)
+    return points
+
+def _lines_at_nodes(lines, key):
+    #ids of the lines at every node of the key function, either end, in input order
+    node_lines = {}
+    for line_id, line in enumerate(lines):
+        start_key, end_key = line_keys(line, key)
+        node_lines.setdefault(start_key, []).append(line_id)
+        if end_key != start_key:
+            node_lines.setdefault(end_key, []).append(line_id)
+    return node_lines
+
+def iter_band_order(lines, band_height, by_weight=True, tolerance=POINT_TOLERANCE, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Weight and order the lines one Z band at a time, lowest band first.
+
+    A line belongs to the band of its average Z. The rules of a band line
+    read the lines at both of its ends and the lines at the ends of those,
+    so that two-ring around the band is all that gets indexed with it, and
+    the weights are the ones add_weight_to_lines gives the whole list with
+    the same tolerance. The endpoint keys are snapped once for the whole
+    list, in input order, so every band reads the nodes that whole list
+    index has.
+
+    Parameters:
+    lines (list): List of Line objects.
+    band_height (float): Height of each Z band.
+    by_weight (bool): Order each band with the weight-ordered traversal, depth first otherwise.
+    tolerance (float): Distance within which endpoints share a node and a band point.
+    instrumentation (Instrumentation): Receives the stage times, and the band, halo line and reused record counts.
+
+    Yields:
+    tuple: (band number, ordered lines, their weights) for each non-empty band.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+    if band_height <= 0:
+        raise ValueError("band_height has to be positive")
+
+    bottom = min(min(line.From.Z, line.To.Z) for line in lines)
+    bands = {}
+    for line_id, line in enumerate(lines):
+        average_z = (line.From.Z + line.To.Z) / 2
+        bands.setdefault(int(math.floor((average_z - bottom) / band_height)), []).append(line_id)
+    key = snapped_key(tolerance)
+    node_lines = _lines_at_nodes(lines, key)
+    records = {}
+
+    for band_number in sorted(bands):
+        band = bands[band_number]
+        kept_records = len(records)
+
+        with instrumentation.stage("band_halo"):
+            #every line at the ends of a band line, and every line at the ends of those
+            ring = set(band)
+            for line_id in band:
+                record = _record(records, lines, line_id, key)
+                ring.update(node_lines[record.start_key])
+                ring.update(node_lines[record.end_key])
+            halo = set(ring)
+            for line_id in ring:
+                record = _record(records, lines, line_id, key)
+                halo.update(node_lines[record.start_key])
+                halo.update(node_lines[record.end_key])
+            halo = sorted(halo)
+            created = len(records) - kept_records
+            #the next band only shares lines with this halo
+            records = {line_id: _record(records, lines, line_id, key) for line_id in halo}
+
+        with instrumentation.stage("index"):
+            index = EndpointIndex([lines[line_id] for line_id in halo], [records[line_id] for line_id in halo])
+        position = {line_id: i for i, line_id in enumerate(halo)}
+        band_lines = [lines[line_id] for line_id in band]
+        with instrumentation.stage("weighting"):
+            band_weights = [line_weight(position[line_id], index) for line_id in band]
+
+        points = band_points(band_lines, tolerance)
+        graph, missing_lines = build_graph(band_lines, points, tolerance, instrumentation)
+        for edge_id, weight in enumerate(band_weights):
+            graph.weight[edge_id] = weight
+        ordered_lines, ordered_weights = order_lines(graph, points, by_weight=by_weight, instrumentation=instrumentation)
+
+        instrumentation.count("bands")
+        instrumentation.count("band_lines", len(band))
+        instrumentation.count("halo_lines", len(halo) - len(band))
+        instrumentation.count("records_reused", len(halo) - created)
+        yield band_number, ordered_lines, ordered_weights
+
+def _record(records, lines, line_id, key):
+    #the LineRecord of a line, made once while the line stays around the bands
+    record = records.get(line_id)
+    if record is None:
+        record = records[line_id] = LineRecord(lines[line_id], key)
+    return record
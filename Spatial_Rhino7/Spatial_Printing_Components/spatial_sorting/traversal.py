@@ -0,0 +1,289 @@
+"""
+Traversals that turn the line graph into a print order.
+"""
+
+import heapq
+
+from .geometry import Line
+from .instrumentation import NULL_INSTRUMENTATION
+
+
+def iter_dfs_edges(graph, verbose=False):
+    """
+    Walk every edge of the graph depth first, using an explicit stack instead of recursion.
+
+    Parameters:
+    graph (CSRGraph): Graph of the lines.
+    verbose (bool): Print every vertex visited.
+
+    Yields:
+    tuple: (order, start index, end index) for each edge in the order it is visited, starting at 1.
+    """
+    for order, start_index, end_index, edge_id in iter_dfs_edge_ids(graph, verbose):
+        yield order, start_index, end_index
+
+def iter_dfs_edge_ids(graph, verbose=False, instrumentation=NULL_INSTRUMENTATION):
+    #same walk as iter_dfs_edges, also yielding the edge id of every visited edge
+    visited_edges = graph.visited_bitmap()
+    indptr = graph.indptr
+    #entries before the position of a vertex are all visited, so no entry is scanned twice
+    position = list(indptr)
+    order = 0
+
+    # Perform DFS for each unvisited point
+    for start_index in range(graph.vertex_count):
+        if verbose:
+            print(f"Starting DFS from vertex {start_index}")
+        stack = [start_index]
+        while stack:
+            vertex = stack[-1]
+            entry = position[vertex]
+            last = indptr[vertex + 1]
+            while entry < last and visited_edges[graph.edge_id[entry]]:
+                entry += 1
+            position[vertex] = entry
+
+            if entry == last:
+                stack.pop()
+                if verbose:
+                    print(f"Finished visiting vertex {vertex}")
+                continue
+
+            neighbor_index = graph.indices[entry]
+            edge_id = graph.edge_id[entry]
+            visited_edges[edge_id] = 1
+            order += 1
+            if verbose:
+                print(f"Visiting edge {order}: {vertex} -> {neighbor_index}")
+            yield order, vertex, neighbor_index, edge_id
+            stack.append(neighbor_index)
+
+        if verbose:
+            print(f"Finished DFS from vertex {start_index}")
+
+    instrumentation.count("edges_visited", order)
+
+def iter_weighted_edge_ids(graph, heights=None, verbose=False, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Walk every edge of the graph, always extending the path along the lowest weight unvisited edge.
+
+    The incident edges of every vertex are sorted by weight once and read
+    through a moving position, and a heap of all edges gives the lowest
+    weight unvisited edge to restart from when a path dead-ends, so the
+    whole walk costs O(E log E).
+
+    Parameters:
+    graph (CSRGraph): Graph of the lines with their weights.
+    heights (list): Optional Z of every vertex, a restart begins at the lower end of its edge.
+    verbose (bool): Print every restart.
+    instrumentation (Instrumentation): Receives the edges_visited and path_restarts counts.
+
+    Yields:
+    tuple: (order, start index, end index, edge id) for each edge in the order it is visited, starting at 1.
+    """
+    visited_edges = graph.visited_bitmap()
+    indptr = graph.indptr
+    indices = graph.indices
+    edge_ids = graph.edge_id
+    weight = graph.weight
+
+    #entries of every vertex sorted by the weight of their edge, ties in line order
+    entries = []
+    for vertex in range(graph.vertex_count):
+        entries.extend(sorted(range(indptr[vertex], indptr[vertex + 1]), key=lambda entry: (weight[edge_ids[entry]], edge_ids[entry])))
+    position = list(indptr)
+
+    #both ends of every edge, the lower vertex index first
+    first_end = {}
+    second_end = {}
+    for vertex in range(graph.vertex_count):
+        for entry in range(indptr[vertex], indptr[vertex + 1]):
+            edge_id = edge_ids[entry]
+            if edge_id in first_end:
+                second_end[edge_id] = vertex
+            else:
+                first_end[edge_id] = vertex
+
+    heap = [(weight[edge_id], edge_id) for edge_id in first_end]
+    heapq.heapify(heap)
+    order = 0
+    restarts = 0
+    while heap:
+        restart_weight, edge_id = heapq.heappop(heap)
+        if visited_edges[edge_id]:
+            continue
+
+        start_index = first_end[edge_id]
+        end_index = second_end[edge_id]
+        if heights is not None and heights[end_index] < heights[start_index]:
+            start_index, end_index = end_index, start_index
+        restarts += 1
+        if verbose:
+            print(f"Starting path from vertex {start_index} at weight {restart_weight}")
+
+        while True:
+            visited_edges[edge_id] = 1
+            order += 1
+            yield order, start_index, end_index, edge_id
+
+            #extend along the lowest weight unvisited edge at the end of the path
+            start_index = end_index
+            entry_position = position[start_index]
+            last = indptr[start_index + 1]
+            while entry_position < last and visited_edges[edge_ids[entries[entry_position]]]:
+                entry_position += 1
+            position[start_index] = entry_position
+            if entry_position == last:
+                break
+            end_index = indices[entries[entry_position]]
+            edge_id = edge_ids[entries[entry_position]]
+
+    instrumentation.count("edges_visited", order)
+    instrumentation.count("path_restarts", restarts)
+
+def iter_trail_edge_ids(graph, heights=None, verbose=False, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Walk every edge of the graph as the fewest continuous trails, each one a single extrusion.
+
+    Every odd degree vertex is joined to one extra hub vertex by a virtual
+    edge, which leaves every vertex with an even degree. Hierholzer's walk
+    then covers all edges in O(E) and the trails are the pieces of the
+    walk between virtual edges, so a connected part with k odd vertices
+    becomes k / 2 trails and a part without any becomes one closed trail,
+    the least any ordering can do.
+
+    Parameters:
+    graph (CSRGraph): Graph of the lines with their weights.
+    heights (list): Optional Z of every vertex, every trail then begins at its lower end.
+    verbose (bool): Print every trail.
+    instrumentation (Instrumentation): Receives the edges_visited and trails counts.
+
+    Yields:
+    tuple: (order, start index, end index, edge id) for each edge, trail by trail starting
+    with the trail of the lowest weight edge, order starting at 1.
+    """
+    indptr = graph.indptr
+    indices = graph.indices
+    edge_ids = graph.edge_id
+    vertex_count = graph.vertex_count
+    edge_count = graph.edge_count
+
+    odd = [vertex for vertex in range(vertex_count) if (indptr[vertex + 1] - indptr[vertex]) % 2]
+    hub = vertex_count
+    #virtual edge ids follow the real ones, one per odd vertex
+    hub_edge = {vertex: edge_count + k for k, vertex in enumerate(odd)}
+    used = bytearray(edge_count + len(odd))
+    position = list(indptr[:vertex_count]) + [0]
+
+    def next_edge(vertex):
+        #first unused (neighbor, edge id) of a vertex, its real edges before its virtual one
+        if vertex == hub:
+            k = position[hub]
+            while k < len(odd) and used[edge_count + k]:
+                k += 1
+            position[hub] = k
+            return (odd[k], edge_count + k) if k < len(odd) else None
+        entry = position[vertex]
+        last = indptr[vertex + 1]
+        while entry < last and used[edge_ids[entry]]:
+            entry += 1
+        position[vertex] = entry
+        if entry < last:
+            return indices[entry], edge_ids[entry]
+        virtual_edge = hub_edge.get(vertex)
+        if virtual_edge is not None and not used[virtual_edge]:
+            return hub, virtual_edge
+        return None
+
+    def walk(start_index):
+        #closed walk over every unused edge reachable from start_index, as (start, end, edge id) steps
+        stack = [(start_index, None, None)]
+        steps = []
+        while stack:
+            found = next_edge(stack[-1][0])
+            if found is None:
+                vertex, previous, edge_id = stack.pop()
+                if edge_id is not None:
+                    steps.append((previous, vertex, edge_id))
+                continue
+            neighbor_index, edge_id = found
+            used[edge_id] = 1
+            stack.append((neighbor_index, stack[-1][0], edge_id))
+        steps.reverse()
+        return steps
+
+    trails = []
+    if odd:
+        #one walk from the hub covers every part with odd vertices, cut it at the virtual edges
+        trail = []
+        for step in walk(hub):
+            if step[2] < edge_count:
+                trail.append(step)
+            elif trail:
+                trails.append(trail)
+                trail = []
+        if trail:
+            trails.append(trail)
+        if heights is not None:
+            for i, trail in enumerate(trails):
+                if heights[trail[-1][1]] < heights[trail[0][0]]:
+                    trails[i] = [(end_index, start_index, edge_id) for start_index, end_index, edge_id in reversed(trail)]
+
+    #the parts left have only even vertices, each is one closed trail
+    for start_index in range(vertex_count):
+        if next_edge(start_index) is None:
+            continue
+        trail = walk(start_index)
+        if heights is not None:
+            lowest = min(range(len(trail)), key=lambda i: (heights[trail[i][0]], i))
+            trail = trail[lowest:] + trail[:lowest]
+        trails.append(trail)
+
+    weight = graph.weight
+    trails.sort(key=lambda trail: min((weight[edge_id], edge_id) for start_index, end_index, edge_id in trail))
+
+    order = 0
+    for trail in trails:
+        if verbose:
+            print(f"Starting trail of {len(trail)} edges from vertex {trail[0][0]}")
+        for start_index, end_index, edge_id in trail:
+            order += 1
+            yield order, start_index, end_index, edge_id
+
+    instrumentation.count("edges_visited", order)
+    instrumentation.count("trails", len(trails))
+
+def iter_ordered_edge_ids(graph, points, verbose=False, by_weight=False, by_trails=False, instrumentation=NULL_INSTRUMENTATION):
+    #the traversal order_lines picks, as (order, start index, end index, edge id)
+    if by_trails:
+        return iter_trail_edge_ids(graph, [pt.Z for pt in points], verbose, instrumentation)
+    if by_weight:
+        return iter_weighted_edge_ids(graph, [pt.Z for pt in points], verbose, instrumentation)
+    return iter_dfs_edge_ids(graph, verbose, instrumentation)
+
+def order_lines(graph, points, verbose=False, by_weight=False, by_trails=False, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Order the lines depth first, producing only data.
+
+    Parameters:
+    graph (CSRGraph): Graph of the lines with their weights.
+    points (list): List of Point objects the graph was built from.
+    verbose (bool): Print every vertex visited.
+    by_weight (bool): Follow the lowest weight edges with iter_weighted_edge_ids instead.
+    by_trails (bool): Split the lines into the fewest continuous trails with iter_trail_edge_ids instead.
+    instrumentation (Instrumentation): Receives the stage time and the traversal counts.
+
+    Returns:
+    tuple: The lines in the order visited and their weights from the graph.
+    """
+    ordered_lines = []
+    ordered_weights = []
+
+    edges = iter_ordered_edge_ids(graph, points, verbose, by_weight, by_trails, instrumentation)
+    with instrumentation.stage("traversal"):
+        for order, start_index, end_index, edge_id in edges:
+            # Create a line between start and end points
+            ordered_lines.append(Line(points[start_index], points[end_index]))
+            ordered_weights.append(graph.weight[edge_id])
+
+    return ordered_lines, ordered_weights
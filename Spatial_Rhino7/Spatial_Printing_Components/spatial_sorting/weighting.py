@@ -0,0 +1,84 @@
+"""
+Weighting of whole line lists with a RuleSet, DEFAULT_RULE_SET unless another is given.
+"""
+
+from .index import EndpointIndex, bottom_to_top
+from .instrumentation import NULL_INSTRUMENTATION, CountingIndex
+from .rules import DEFAULT_RULE_SET
+
+
+def add_weight_to_lines(lines, graph=None, index=None, instrumentation=NULL_INSTRUMENTATION, rule_set=None, tolerance=None):
+    """
+    Assign a weight to each line based on the average Z height of its start and end points.
+
+    Parameters:
+    lines (list): List of Line objects.
+    graph (CSRGraph): Graph of the lines, its weight array is filled by edge id. Can be None.
+    index (EndpointIndex): Optional prebuilt index of lines, built here when omitted.
+    instrumentation (Instrumentation): Receives the stage times, and the line, flip, index and rule counts.
+    rule_set (RuleSet): Optional rule table to weigh the lines with instead of DEFAULT_RULE_SET.
+    tolerance (float): Optional snapping distance of the index built here, the one the graph was built with.
+
+    Returns:
+    dict: A dictionary mapping each bottom-to-top line to its assigned weight.
+    """
+    
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+
+    if index is None:
+        with instrumentation.stage("index"):
+            index = EndpointIndex(lines, tolerance=tolerance)
+
+    weigh = (DEFAULT_RULE_SET if rule_set is None else rule_set).line_weight
+    with instrumentation.stage("weighting"):
+        if instrumentation.enabled:
+            weight_values = _counted_weights(lines, index, instrumentation, weigh)
+        else:
+            weight_values = [weigh(line_id, index) for line_id in range(len(lines))]
+        return collect_weights(lines, weight_values, graph)
+
+def _counted_weights(lines, index, instrumentation, weigh):
+    #weigh every line, counting what the rules look at and which of them fire
+    rule_counts = {}
+    counting_index = CountingIndex(index, instrumentation)
+    weight_values = [weigh(line_id, counting_index, rule_counts) for line_id in range(len(lines))]
+    instrumentation.count("lines_scanned", len(lines))
+    instrumentation.count("flips", sum(1 for line_id, line in enumerate(lines) if index.records[line_id].line is not line))
+    for rule_name, fired in rule_counts.items():
+        instrumentation.count("rule:" + rule_name, fired)
+    return weight_values
+
+def line_weight(line_id, index, rule_counts=None, rule_set=DEFAULT_RULE_SET):
+    """
+    Weight of one line of an EndpointIndex.
+
+    Parameters:
+    line_id (int): Position of the line in the indexed list.
+    index (EndpointIndex): Index of the lines.
+    rule_counts (dict): Optional count of the non-zero results of every rule, by rule name.
+    rule_set (RuleSet): Rule table to weigh with.
+
+    Returns:
+    float: The weight, rounded to 3 decimals.
+    """
+    return rule_set.line_weight(line_id, index, rule_counts)
+
+def collect_weights(lines, weight_values, graph=None):
+    """
+    Pair the lines, read bottom-to-top, with their weights.
+
+    Parameters:
+    lines (list): List of Line objects, left unchanged.
+    weight_values (list): Weight of each line.
+    graph (CSRGraph): Graph of the lines, its weight array is filled by edge id. Can be None.
+
+    Returns:
+    dict: A dictionary mapping each bottom-to-top line to its assigned weight.
+    """
+    weights = {}
+    for line_id, line in enumerate(lines):
+        weights[bottom_to_top(line)] = weight_values[line_id]
+        if graph is not None:
+            graph.weight[line_id] = weight_values[line_id]
+    return weights
@@ -0,0 +1,165 @@
+"""
+Vectorized NumPy version of the weight rules in weighting.py.
+
+NumPy is imported when the functions are called, the rest of the package
+does not depend on it.
+"""
+
+from .index import FLAT_TOLERANCE
+from .rules import (ANGLED_AT_END_WEIGHT, ANGLED_AT_START_WEIGHT, NO_ANGLE_AT_TOP_WEIGHT, VERTICAL_AT_END_WEIGHT,
+                    VERTICAL_AT_START_WEIGHT, Z_OFFSET)
+from .weighting import collect_weights
+
+
+def line_endpoint_array(lines):
+    """
+    Load the endpoints of a list of lines into a single array.
+
+    Parameters:
+    lines (list): List of Line objects.
+
+    Returns:
+    numpy.ndarray: (N, 2, 3) float array of the From and To points of each line.
+    """
+    import numpy as np
+
+    endpoints = np.empty((len(lines), 2, 3), dtype=float)
+    for line_id, line in enumerate(lines):
+        endpoints[line_id, 0] = (line.From.X, line.From.Y, line.From.Z)
+        endpoints[line_id, 1] = (line.To.X, line.To.Y, line.To.Z)
+    return endpoints
+
+def round_array(values, decimals):
+    """
+    Round every value of an array exactly like the built-in round does.
+
+    np.round scales by a power of ten first, so a value whose scaled
+    product lands on or next to a half, like 0.005 or 10.0065, can round
+    the other way than round(value, decimals). Those values are rounded
+    again one by one with round.
+
+    Parameters:
+    values (numpy.ndarray): Float array of any shape.
+    decimals (int): Number of decimals to keep.
+
+    Returns:
+    numpy.ndarray: Float array of the rounded values.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    scaled = values * 10.0 ** decimals
+    rounded = np.round(values, decimals)
+    #the product is off by at most half an ulp, so only values this close to a half can differ
+    near_half = np.abs(np.abs(scaled - np.floor(scaled)) - .5) <= 2 * np.spacing(np.abs(scaled))
+    if near_half.any():
+        rounded[near_half] = [round(value, decimals) for value in values[near_half].tolist()]
+    return rounded
+
+def weight_array(endpoints):
+    """
+    Vectorized version of add_weight_to_lines working on a whole lattice at once.
+
+    Lines are classified and read bottom-to-top like EndpointIndex does, the
+    endpoints are joined through their sorted 0.01-quantized keys and every
+    weight rule is evaluated for all lines in one array operation.
+
+    Parameters:
+    endpoints (numpy.ndarray): (N, 2, 3) array of line endpoints, see line_endpoint_array.
+
+    Returns:
+    numpy.ndarray: (N,) array of weights, in the order of the input lines.
+    """
+    import numpy as np
+
+    endpoints = np.asarray(endpoints, dtype=float)
+    line_count = len(endpoints)
+    if line_count == 0:
+        raise ValueError("Input list of lines is empty")
+
+    first = endpoints[:, 0]
+    second = endpoints[:, 1]
+    flip = first[:, 2] > second[:, 2]
+    start = np.where(flip[:, None], second, first)
+    end = np.where(flip[:, None], first, second)
+
+    #same 0.01 grid as point_key, as integers so the keys can be sorted and compared exactly
+    start_key = np.rint(round_array(start, 2) * 100).astype(np.int64)
+    end_key = np.rint(round_array(end, 2) * 100).astype(np.int64)
+
+    round_vertical = (start_key[:, 0] == end_key[:, 0]) & (start_key[:, 1] == end_key[:, 1])
+    horizontal = start[:, 2] == end[:, 2]
+    vertical = ~horizontal & round_vertical
+    angled = ~horizontal & ~round_vertical
+    flat = np.abs(end[:, 2] - start[:, 2]) <= FLAT_TOLERANCE
+    exact_vertical = (start[:, 0] == end[:, 0]) & (start[:, 1] == end[:, 1])
+    average_z = (first[:, 2] + second[:, 2]) / 2
+
+    #number the nodes by sorting all the endpoint keys, start nodes first then end nodes
+    keys = np.concatenate((start_key, end_key))
+    order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    new_node = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    node_ids = np.empty(len(keys), dtype=np.int64)
+    node_ids[order] = np.concatenate(([0], np.cumsum(new_node)))
+    start_node = node_ids[:line_count]
+    end_node = node_ids[line_count:]
+    node_count = int(node_ids.max()) + 1
+    line_ids = np.arange(line_count)
+
+    def node_has(line_nodes, mask):
+        #True for every node that has at least one line of mask on it
+        found = np.zeros(node_count, dtype=bool)
+        found[line_nodes[mask]] = True
+        return found
+
+    #find_intersection_vertical_at_start
+    vertical_at_start = np.where(node_has(start_node, ~flat & ~exact_vertical)[start_node], VERTICAL_AT_START_WEIGHT, 0)
+    #find_intersection_vertical_at_end
+    vertical_at_end = np.where(~flat & node_has(end_node, ~exact_vertical)[end_node], VERTICAL_AT_END_WEIGHT, 0)
+    #find_intersection_angled_at_start
+    angled_at_start = np.where(~flat & node_has(start_node, round_vertical)[start_node], ANGLED_AT_START_WEIGHT, 0)
+    #find_intersection_angled_at_end
+    angled_at_end = np.where(node_has(end_node, ~flat & exact_vertical)[end_node], ANGLED_AT_END_WEIGHT, 0)
+
+    #verticals_with_angled_at_start, the first vertical in list order ending at the end
+    #of the line that is not a copy of it passes on its vertical_at_start weight
+    first_vertical = np.full(node_count, line_count)
+    np.minimum.at(first_vertical, end_node[round_vertical], line_ids[round_vertical])
+    first_start = start_node[np.minimum(first_vertical[end_node], line_count - 1)]
+    other_start = round_vertical & (start_node != first_start)
+    second_vertical = np.full(node_count, line_count)
+    np.minimum.at(second_vertical, end_node[other_start], line_ids[other_start])
+    chosen = first_vertical[end_node]
+    copy = (chosen < line_count) & (start_node[np.minimum(chosen, line_count - 1)] == start_node)
+    chosen = np.where(copy, second_vertical[end_node], chosen)
+    with_angled_at_start = np.where(chosen < line_count, vertical_at_start[np.minimum(chosen, line_count - 1)], 0)
+
+    #vertical_no_angle_at_top, compare against the lowest angled line ending at the top
+    angled_at_top = ~flat & ~exact_vertical
+    lowest_at_top = np.full(node_count, np.inf)
+    np.minimum.at(lowest_at_top, end_node[angled_at_top], average_z[angled_at_top])
+    no_angle_at_top = np.where(lowest_at_top[end_node] <= average_z, 0, NO_ANGLE_AT_TOP_WEIGHT)
+
+    weights = np.zeros(line_count)
+    weights = np.where(vertical, weights + vertical_at_end + vertical_at_start + no_angle_at_top, weights)
+    weights = np.where(angled, weights + angled_at_start + angled_at_end + with_angled_at_start, weights)
+    weights = weights + average_z - Z_OFFSET
+    return round_array(weights, 3)
+
+def add_weight_to_lines_numpy(lines, graph=None):
+    """
+    Assign a weight to each line with the vectorized weight_array engine.
+
+    Parameters:
+    lines (list): List of Line objects.
+    graph (CSRGraph): Graph of the lines, its weight array is filled by edge id. Can be None.
+
+    Returns:
+    dict: A dictionary mapping each line to its assigned weight, same as add_weight_to_lines.
+    """
+    if not lines:
+        raise ValueError("Input list of lines is empty")
+
+    weight_values = weight_array(line_endpoint_array(lines))
+    return collect_weights(lines, weight_values.tolist(), graph)
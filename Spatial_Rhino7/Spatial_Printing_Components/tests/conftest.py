@@ -0,0 +1,9 @@
+"""
+Makes spatial_sorting and the lattice generators of the benchmarks importable from any folder.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "benchmarks")]
@@ -0,0 +1,236 @@
+"""
+Tests of the spatial_sorting stages on small generated lattices.
+
+benchmarks/run_benchmarks.py compares the weights, combined lines and
+print order with the original code. The tests here check the stages
+built on top of those against plain definitions of what they have to give.
+
+Run from any folder:
+
+    python -m pytest tests
+"""
+
+import random
+import time
+
+import pytest
+
+import lattices
+from spatial_sorting import (POINT_TOLERANCE, EndpointIndex, IncrementalSession, Instrumentation, Line, Point, ResultCache,
+                             SolveCache, build_graph, cached_result, combine_lines, compute_result, endpoint_hash,
+                             iter_band_order, iter_dfs_edge_ids, iter_trail_edge_ids, lines_at, nearest_neighbor_order,
+                             order_components, remove_overlapping_lines, sequence_segments, split_segments, travel_distance,
+                             two_opt)
+from spatial_sorting.weighting import line_weight
+
+STRUTS = 300
+
+
+@pytest.fixture(params=sorted(lattices.GENERATORS))
+def lattice(request):
+    #lines and points of a small lattice of every kind
+    return lattices.lattice_for_struts(request.param, STRUTS)
+
+def _line_key(line):
+    return (line.From.X, line.From.Y, line.From.Z, line.To.X, line.To.Y, line.To.Z)
+
+def _edge_key(line):
+    #the same key whichever way the line runs
+    return min(_line_key(line), _line_key(Line(line.To, line.From)))
+
+def _weights(lines, tolerance=None):
+    index = EndpointIndex(lines, tolerance=tolerance)
+    return [line_weight(line_id, index) for line_id in range(len(lines))]
+
+def _nudged(lines, points):
+    #jittered onto rounding ties, then every line end moved on its own by less than half the tolerance
+    rnd = random.Random(0)
+    moved_lines, moved_points = lattices.jittered(lines, points, 0)
+
+    def nudge(pt):
+        return Point(*(value + rnd.uniform(-.0002, .0002) for value in (pt.X, pt.Y, pt.Z)))
+
+    return [Line(nudge(line.From), nudge(line.To)) for line in moved_lines], moved_points
+
+def _print_order(lines, points):
+    graph, missing_lines = build_graph(lines, points, POINT_TOLERANCE)
+    return [Line(points[start], points[end]) for order, start, end, edge_id in iter_dfs_edge_ids(graph)]
+
+def test_incremental_session_matches_full_run(lattice):
+    #each edit lands on nodes the rules and the combining stage read, update() runs after every other one
+    lines, points = lattice
+    rnd = random.Random(0)
+    session = IncrementalSession(lines)
+    for edit in range(40):
+        first_id, second_id = rnd.sample(session.line_ids(), 2)
+        other = session.records[second_id]
+        choice = rnd.random()
+        if choice < .3:
+            session.remove_line(first_id)
+        elif choice < .6:
+            session.add_line(Line(session.records[first_id].start, other.end))
+        else:
+            session.move_line(first_id, Line(session.records[first_id].start, rnd.choice((other.start, other.end))))
+        if edit % 2:
+            continue
+
+        session.update()
+        current_lines = session.lines()
+        index = EndpointIndex(current_lines)
+        weights = [line_weight(line_id, index) for line_id in range(len(current_lines))]
+        assert [session.weights.get(line_id) for line_id in session.line_ids()] == weights, \
+            f"session weights differ from a full run after edit {edit}"
+        combined_lines, combined_weights = remove_overlapping_lines(*combine_lines(current_lines, weights, index.records))
+        session_lines, session_weights = session.combined_lines()
+        assert list(map(_line_key, session_lines)) == list(map(_line_key, combined_lines)), \
+            f"session combined lines differ from a full run after edit {edit}"
+        assert session_weights == combined_weights, f"session combined weights differ from a full run after edit {edit}"
+
+def test_order_components_keeps_whole_list_weights(lattice):
+    #copies side by side, each raised a little more than the one before so they come out lowest first
+    lines, points = lattice
+    spacing = 1000.0
+    islands = []
+    for copy in range(2, -1, -1):
+        islands.extend(Line(Point(line.From.X + copy * spacing, line.From.Y, line.From.Z + copy),
+                            Point(line.To.X + copy * spacing, line.To.Y, line.To.Z + copy)) for line in lines)
+    weights = {}
+    for line, weight in zip(islands, _weights(islands, POINT_TOLERANCE)):
+        weights[_line_key(line)] = weights[_line_key(Line(line.To, line.From))] = weight
+
+    for workers in (1, 2):
+        ordered_lines, ordered_weights = order_components(islands, workers=workers)
+        assert sorted(map(_edge_key, ordered_lines)) == sorted(map(_edge_key, islands)), \
+            f"not every line ordered once on {workers} workers"
+        assert [weights[_line_key(line)] for line in ordered_lines] == ordered_weights, \
+            f"component weights differ from the whole list on {workers} workers"
+        copy_of = [int(line.From.X // spacing) for line in ordered_lines]
+        assert copy_of == sorted(copy_of), f"components not ordered lowest first on {workers} workers"
+
+def test_band_order_matches_whole_list_tolerance(lattice):
+    lines, points = lattice
+    nudged_lines, nudged_points = _nudged(lines, points)
+    band_weights = []
+    for band_number, ordered_lines, ordered_weights in iter_band_order(nudged_lines, 10.0):
+        band_weights.extend(ordered_weights)
+    assert sorted(band_weights) == sorted(_weights(nudged_lines, POINT_TOLERANCE)), \
+        "band weights differ from a whole list index with the same tolerance"
+
+def test_lines_at_matches_brute_force(lattice):
+    lines, points = lattice
+    nudged_lines, nudged_points = _nudged(lines, points)
+    grid = endpoint_hash(nudged_lines, POINT_TOLERANCE)
+    for pt in nudged_points:
+        expected = [line_id for line_id, line in enumerate(nudged_lines)
+                    if min(pt.DistanceTo(line.From), pt.DistanceTo(line.To)) <= POINT_TOLERANCE]
+        assert lines_at(grid, pt) == expected, f"lines at {pt.X}, {pt.Y}, {pt.Z} differ from the brute force"
+
+def test_result_cache_round_trip(lattice, tmp_path):
+    lines, points = lattice
+    expected = compute_result(lines, points)
+    cache = ResultCache(str(tmp_path))
+    for attempt in ("stored", "loaded"):
+        result = cached_result(lines, points, cache)
+        assert result.weights == expected.weights, f"{attempt} weights differ"
+        assert result.combined_weights == expected.combined_weights, f"{attempt} combined weights differ"
+        assert result.order == expected.order, f"{attempt} order differs"
+        assert list(map(_line_key, result.combined_lines)) == list(map(_line_key, expected.combined_lines)), \
+            f"{attempt} combined lines differ"
+
+def test_solve_cache_falls_back_to_result_cache(lattice, tmp_path):
+    #a new store, like scriptcontext.sticky in a new Rhino session, reads the weights the first one wrote
+    lines, points = lattice
+    expected = SolveCache({}).solve(lines, points)[0]
+    instrumentation = Instrumentation()
+    for session in ("writing", "reading"):
+        state, cached = SolveCache({}, result_cache=ResultCache(str(tmp_path))).solve(lines, points,
+                                                                                   instrumentation=instrumentation)
+        assert not cached, f"{session} session found the lattice in a new store"
+        assert list(state.weights.items()) == list(expected.weights.items()), f"{session} session weights differ"
+        assert list(state.graph.weight) == list(expected.graph.weight), f"{session} session graph weights differ"
+    assert instrumentation.counters["result_cache_misses"] == 1, "first session did not miss the result cache"
+    assert instrumentation.counters["result_cache_hits"] == 1, "second session did not hit the result cache"
+    assert cached_result(lines, points, ResultCache(str(tmp_path / "plain"))).weights == list(expected.graph.weight), \
+        "result cache weights differ from the solve cache"
+
+def _fewest_trails(graph):
+    #a connected part with k odd degree vertices needs k / 2 trails, and one when it has none
+    parent = list(range(graph.vertex_count))
+
+    def find(vertex):
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    for vertex in range(graph.vertex_count):
+        for neighbor, edge_id in graph.neighbors(vertex):
+            parent[find(vertex)] = find(neighbor)
+    odd_vertices = {}
+    for vertex in range(graph.vertex_count):
+        if graph.degree(vertex):
+            root = find(vertex)
+            odd_vertices[root] = odd_vertices.get(root, 0) + graph.degree(vertex) % 2
+    return sum(max(1, odd // 2) for odd in odd_vertices.values())
+
+def test_trails_are_fewest_possible(lattice):
+    lines, points = lattice
+    graph, missing_lines = build_graph(lines, points, POINT_TOLERANCE)
+    steps = list(iter_trail_edge_ids(graph, [pt.Z for pt in points]))
+    assert sorted(edge_id for order, start, end, edge_id in steps) == list(range(graph.edge_count)), \
+        "not every edge walked once"
+    trails = 1 if steps else 0
+    for previous, step in zip(steps, steps[1:]):
+        if step[1] != previous[2]:
+            trails += 1
+    assert trails == _fewest_trails(graph), "more trails than the graph needs"
+
+def test_nearest_neighbor_order_matches_brute_force(lattice):
+    lines, points = lattice
+    segments = split_segments(_print_order(lines, points))
+    remaining = list(range(1, len(segments)))
+    brute_force = [segments[0]]
+    while remaining:
+        position = brute_force[-1][-1].To
+        nearest = min(remaining, key=lambda i: (position.DistanceTo(segments[i][0].From), i))
+        remaining.remove(nearest)
+        brute_force.append(segments[nearest])
+    chained = nearest_neighbor_order(segments)
+    assert list(map(id, chained)) == list(map(id, brute_force)), "chain differs from the brute force nearest neighbor"
+    assert travel_distance(two_opt(chained, time.monotonic() + .2)) <= travel_distance(chained) + 1e-9, \
+        "2-opt added travel"
+
+def test_sequence_segments_bottom_band_first(lattice):
+    lines, points = lattice
+    band_height = 10.0
+    segments = split_segments(_print_order(lines, points))
+    sequenced, before, after = sequence_segments(segments, band_height, .2)
+    assert sorted(map(id, sequenced)) == sorted(map(id, segments)), "segments lost or repeated"
+    bottoms = [min(min(line.From.Z, line.To.Z) for line in segment) for segment in sequenced]
+    bands = [int((bottom - min(bottoms)) // band_height) for bottom in bottoms]
+    assert bands == sorted(bands), "segments not sequenced bottom band first"
+    assert before == travel_distance(segments), "travel before sequencing misreported"
+    assert after == travel_distance(sequenced), "travel after sequencing misreported"
+
+def test_numpy_weights_off_grid(lattice):
+    #moved off the grid the coordinates land on rounding ties
+    pytest.importorskip("numpy")
+    from spatial_sorting import line_endpoint_array, weight_array
+
+    lines, points = lattice
+    moved_lines, moved_points = lattices.jittered(lines, points, 0)
+    assert weight_array(line_endpoint_array(moved_lines)).tolist() == _weights(moved_lines), \
+        "NumPy weights differ from line_weight"
+
+def test_lattice_file_engine(lattice):
+    pytest.importorskip("numpy")
+    from spatial_sorting import lattice_from_lines, lattice_graph, weight_lattice
+
+    lines, points = lattice
+    moved_lines, moved_points = lattices.jittered(lines, points, 0)
+    binary_lattice = lattice_from_lines(moved_lines)
+    lattice_lines = binary_lattice.lines()
+    assert weight_lattice(binary_lattice).tolist() == _weights(lattice_lines), "weight_lattice differs from line_weight"
+    graph, missing_lines = build_graph(lattice_lines, binary_lattice.points(), POINT_TOLERANCE)
+    assert list(lattice_graph(binary_lattice).orientation) == list(graph.orientation), \
+        "lattice_graph orientations differ from build_graph"